@@ -1,7 +1,10 @@
 import os
 import openai
 import json
-from PyQt5.QtWidgets import QApplication, QWidget, QTextEdit, QLineEdit, QVBoxLayout, QPushButton
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PyQt5.QtWidgets import QApplication, QWidget, QTextEdit, QLineEdit, QVBoxLayout, QPushButton, QProgressBar
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QUrl
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QClipboard
 
@@ -45,6 +48,112 @@ class LLMWorker(QThread):
         except Exception as e:
             self.result_ready.emit(f"Error: {e}")
 
+UPLOAD_CACHE_FILE = "upload_cache.json"  # SHA-256 -> OpenAI file_id of files already uploaded
+MAX_PARALLEL_UPLOADS = 4
+
+def sha256_of_file(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_data:
+        for chunk in iter(lambda: file_data.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class UploadCache:
+    """Local map from file content hash to the OpenAI file_id it was uploaded as."""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        try:
+            with open(cache_file, 'r') as file:
+                self.entries = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, digest):
+        with self.lock:
+            return self.entries.get(digest)
+
+    def put(self, digest, file_id):
+        with self.lock:
+            self.entries[digest] = file_id
+
+    def discard(self, digest):
+        with self.lock:
+            self.entries.pop(digest, None)
+
+    def save(self):
+        with self.lock:
+            with open(self.cache_file, 'w') as file:
+                json.dump(self.entries, file, indent=4)
+
+class UploadWorker(QThread):
+    """Uploads a batch of dropped files in parallel and attaches them to the thread in one message."""
+    progress = pyqtSignal(int, int)             # files finished, total files
+    file_uploaded = pyqtSignal(str, str, bool)  # path, file_id, reused from cache
+    file_failed = pyqtSignal(str, str)          # path, error
+    attach_done = pyqtSignal(str)               # status message for the attachment step
+
+    def __init__(self, file_paths, openai_client, thread_openai, upload_cache):
+        super().__init__()
+        self.file_paths = file_paths
+        self.openai_client = openai_client
+        self.thread_openai = thread_openai
+        self.upload_cache = upload_cache
+
+    def upload_one(self, file_path):
+        """Return (file_id, from_cache); unchanged files reuse the file_id of a previous upload."""
+        digest = sha256_of_file(file_path)
+        cached_id = self.upload_cache.get(digest)
+        if cached_id:
+            try:
+                self.openai_client.files.retrieve(cached_id)
+                return cached_id, True
+            except Exception:
+                # The file was deleted on the OpenAI side; upload it again
+                self.upload_cache.discard(digest)
+        with open(file_path, 'rb') as file_data:
+            file_object = self.openai_client.files.create(
+                file=file_data,
+                purpose='assistants'
+            )
+        self.upload_cache.put(digest, file_object.id)
+        return file_object.id, False
+
+    def run(self):
+        file_ids = []
+        total = len(self.file_paths)
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_UPLOADS) as pool:
+            futures = {pool.submit(self.upload_one, path): path for path in self.file_paths}
+            for done, future in enumerate(as_completed(futures), start=1):
+                file_path = futures[future]
+                try:
+                    file_id, from_cache = future.result()
+                    file_ids.append(file_id)
+                    self.file_uploaded.emit(file_path, file_id, from_cache)
+                except Exception as e:
+                    self.file_failed.emit(file_path, str(e))
+                self.progress.emit(done, total)
+
+        try:
+            self.upload_cache.save()
+        except Exception as e:
+            self.attach_done.emit(f"Failed to save upload cache: {e}")
+
+        if not file_ids:
+            return
+        # Attach all files to the thread
+        try:
+            self.openai_client.beta.threads.messages.create(
+                thread_id=self.thread_openai.id,
+                role="user",
+                content="File uploaded." if len(file_ids) == 1 else f"{len(file_ids)} files uploaded.",
+                attachments=[{"file_id": file_id, "tools": [{"type": "file_search"}]} for file_id in file_ids]
+            )
+            self.attach_done.emit(f"Attached {len(file_ids)} file(s) to the thread.")
+        except Exception as e:
+            self.attach_done.emit(f"Failed to attach file to thread: {e}")
+
 class OpenAIChatbot(QWidget):
     def __init__(self):
         super().__init__()
@@ -75,6 +184,9 @@ class OpenAIChatbot(QWidget):
 
         self.thread = self.client.beta.threads.create()
 
+        self.upload_cache = UploadCache(UPLOAD_CACHE_FILE)
+        self.upload_workers = []
+
         # Initialize GUI
         self.init_gui()
 
@@ -99,6 +211,11 @@ class OpenAIChatbot(QWidget):
         self.user_input.setPlaceholderText("Type your message and press Enter")
         layout.addWidget(self.user_input)
 
+        # Progress of drag-and-drop uploads, hidden while idle
+        self.upload_progress = QProgressBar(self)
+        self.upload_progress.setVisible(False)
+        layout.addWidget(self.upload_progress)
+
         # Button for copying the latest AI response
         self.copy_button = QPushButton("Copy Latest Answer")
         self.copy_button.clicked.connect(self.copy_latest_answer)
@@ -117,32 +234,49 @@ class OpenAIChatbot(QWidget):
             event.ignore()
 
     def dropEvent(self, event: QDropEvent):
-        urls = event.mimeData().urls()
-        if urls:
-            file_path = urls[0].toLocalFile()
-            self.upload_file(file_path)
+        file_paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        file_paths = [path for path in file_paths if os.path.isfile(path)]
+        if file_paths:
+            self.upload_files(file_paths)
 
-    def upload_file(self, file_path):
-        try:
-            with open(file_path, 'rb') as file_data:
-                file_object = self.client.files.create(
-                    file=file_data,
-                    purpose='assistants'
-                )
-            self.text_area.append(f"File uploaded successfully: ID {file_object.id}")
-            # Attach the file to the thread
-            try:
-                self.client.beta.threads.messages.create(
-                    thread_id=self.thread.id,
-                    role="user",
-                    content="File uploaded.",
-                    attachments=[{"file_id": file_object.id, "tools": [{"type": "file_search"}]}]
-                )
-            except Exception as e:
-                self.text_area.append(f"Failed to attach file to thread: {e}")
-            self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
-        except Exception as e:
-            self.text_area.append(f"Failed to upload file: {e}")
+    def upload_files(self, file_paths):
+        self.text_area.append(f"Uploading {len(file_paths)} file(s)...")
+        self.upload_progress.setRange(0, len(file_paths))
+        self.upload_progress.setValue(0)
+        self.upload_progress.setVisible(True)
+
+        # Start the worker thread
+        worker = UploadWorker(file_paths, self.client, self.thread, self.upload_cache)
+        worker.progress.connect(self.on_upload_progress)
+        worker.file_uploaded.connect(self.on_file_uploaded)
+        worker.file_failed.connect(self.on_file_failed)
+        worker.attach_done.connect(self.on_attach_done)
+        worker.finished.connect(lambda: self.on_upload_finished(worker))
+        self.upload_workers.append(worker)
+        worker.start()
+
+    def on_upload_progress(self, done, total):
+        self.upload_progress.setRange(0, total)
+        self.upload_progress.setValue(done)
+
+    def on_file_uploaded(self, file_path, file_id, from_cache):
+        name = os.path.basename(file_path)
+        if from_cache:
+            self.text_area.append(f"File unchanged, reusing upload: {name} (ID {file_id})")
+        else:
+            self.text_area.append(f"File uploaded successfully: {name} (ID {file_id})")
+
+    def on_file_failed(self, file_path, error):
+        self.text_area.append(f"Failed to upload file {os.path.basename(file_path)}: {error}")
+
+    def on_attach_done(self, message):
+        self.text_area.append(message)
+        self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
+
+    def on_upload_finished(self, worker):
+        self.upload_workers.remove(worker)
+        if not self.upload_workers:
+            self.upload_progress.setVisible(False)
 
     def on_enter_pressed(self):
         user_input = self.user_input.text().strip()
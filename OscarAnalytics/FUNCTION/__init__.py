@@ -1,9 +1,15 @@
 # FUNCTION/__init__.py
 
 from .db_client               import DatabaseClient
-from .generate_histogram      import generate_histogram_from_query
+from .generate_histogram      import generate_histogram_from_query, histogram_bins
+from .query_cache             import QueryCache, bump_data_version
+from .query_log               import QueryLog
 
 __all__ = [
     "DatabaseClient",
     "generate_histogram_from_query",
+    "histogram_bins",
+    "QueryCache",
+    "bump_data_version",
+    "QueryLog",
 ]
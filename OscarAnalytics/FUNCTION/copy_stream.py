@@ -0,0 +1,46 @@
+import io
+import pandas as pd
+
+"""
+File-like CSV view of an iterator of rows, for cursor.copy_expert(... FROM STDIN WITH (FORMAT csv)).
+Used by DatabaseClient.copy_from and censusToPostgres.py.
+
+Rows are encoded only as COPY reads them, so the iterator is never materialized. None, NaN, NA and
+NaT are written as unquoted empty fields, which COPY loads as NULL; strings are always quoted, so
+an empty string stays an empty string.
+"""
+
+SPECIAL_CHARACTERS = (',', '"', '\r', '\n')
+
+def csv_field(value):
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return ''
+    text = str(value)
+    if isinstance(value, str) or any(ch in text for ch in SPECIAL_CHARACTERS):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+class CsvRowStream(io.TextIOBase):
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        lines = []
+        length = len(self.buffer)
+        while size < 0 or length < size:
+            try:
+                row = next(self.rows)
+            except StopIteration:
+                break
+            line = ",".join(map(csv_field, row)) + "\n"
+            lines.append(line)
+            length += len(line)
+        self.buffer += "".join(lines)
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
@@ -1,13 +1,48 @@
 import os
+import io
+import time
+import uuid
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import sql as pgsql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+import numpy as np
+import pandas as pd
+from .copy_stream import CsvRowStream
+
+# Connections idle for longer than this are pinged before being handed out in pooled mode
+HEALTH_CHECK_IDLE_SECONDS = 30
+# Rows per batch for stream()
+STREAM_BATCH_SIZE = 10000
+# Rows per INSERT statement for insert_many()
+INSERT_PAGE_SIZE = 1000
+# Type OIDs of text, varchar, char ("bpchar"), "char" and name columns, which query_frame keeps as strings
+TEXT_TYPE_OIDS = {25, 1043, 1042, 18, 19}
+
+def table_identifier(table):
+    """Quoted identifier for "table" or "schema.table"."""
+    return pgsql.Identifier(*table.split("."))
 
 class DatabaseClient:
     """
     A simple persistent PostgreSQL client for pipeline use.
     Maintains one connection and cursor until closed.
+
+    With pooled=True it instead keeps a thread-safe pool that opens min_connections connections
+    and grows to max_connections, keeping them open once made: every query/execute checks one
+    out and returns it, so one client can be shared by threads. connection() and cursor() check
+    out a connection explicitly.
+
+    With a query_cache.QueryCache as `cache`, query/query_frame/query_arrays results are reused
+    until they expire or an import bumps the data version; pass cached=False to bypass it.
+
+    With a query_log.QueryLog as `query_log`, every statement that query/execute/query_frame runs
+    is logged with its latency, rows and bytes, and slow ones with their EXPLAIN ANALYZE plan.
     """
 
-    def __init__(self):
+    def __init__(self, pooled=False, min_connections=1, max_connections=10, cache=None, query_log=None):
         # Load database configuration from environment variables
         self._config = {
             'dbname':   os.getenv('DB_NAME', 'postgres'),
@@ -19,40 +54,268 @@ class DatabaseClient:
         self.conn = None
         self.cur = None
 
+        self.pooled = pooled
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool = None
+        self._slots = threading.BoundedSemaphore(max_connections)  # Makes checkout wait instead of failing when all are in use
+        self._last_used = {}  # id(connection) -> time it was last checked in
+        self.cache = cache
+        self.query_log = query_log
+
     def connect(self):
-        """Establishes the database connection and cursor."""
+        """Establishes the database connection and cursor (or the pool, in pooled mode)."""
+        if self.pooled:
+            if self.pool is None or self.pool.closed:
+                self.pool = ThreadedConnectionPool(self.min_connections, self.max_connections, **self._config)
+                # The pool closes a returned connection once it holds minconn idle ones; opening
+                # min_connections up front but keeping up to max_connections avoids a reconnect per checkout
+                self.pool.minconn = self.max_connections
+            return self
         if self.conn is None or self.conn.closed:
             self.conn = psycopg2.connect(**self._config)
             self.cur = self.conn.cursor()
         return self
 
-    def query(self, sql, params=None):
+    def _healthy(self, conn):
+        """False if `conn` is closed or, after being idle for a while, does not answer a ping."""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < HEALTH_CHECK_IDLE_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of the block. In pooled mode it comes from the
+        pool (replaced if it fails its health check) and goes back afterwards, rolled back if the
+        block did not commit; otherwise it is the client's own connection.
+        """
+        if not self.pooled:
+            self.connect()
+            yield self.conn
+            return
+        if self.pool is None or self.pool.closed:
+            self.connect()
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self.pool.getconn()
+            if not self._healthy(conn):
+                self.pool.putconn(conn, close=True)
+                conn = None  # Already returned; must not be put back again if getconn() raises
+                conn = self.pool.getconn()
+            yield conn
+        finally:
+            if conn is not None:
+                self._last_used[id(conn)] = time.monotonic()
+                # The pool rolls back a connection left inside a transaction
+                self.pool.putconn(conn, close=conn.closed != 0)
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self):
+        """A fresh cursor on a checked-out connection, closed at the end of the block."""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                yield cur
+
+    def _record(self, conn, sql, params, start, rows, nbytes=None, result=None):
+        """Log a statement that started at `start` (time.perf_counter()), if logging is on."""
+        if self.query_log is not None:
+            self.query_log.record(conn, sql, params, time.perf_counter() - start, rows, nbytes, result)
+
+    def _cached(self, kind, sql, params, fetch):
+        """The cached result of `fetch()` for this SQL, parameters and data version, fetching it on a miss."""
+        with self.connection() as conn:
+            version = self.cache.data_version(conn)
+        # Which database the result comes from, without the password
+        database = [self._config[name] for name in ('host', 'port', 'dbname', 'user')]
+        key = self.cache.key(kind, sql, params, version, database)
+        result = self.cache.get(key)
+        if result is None:
+            result = fetch()
+            self.cache.put(key, sql, result)
+        return result
+
+    def query(self, sql, params=None, cached=True):
         """
         Executes a SQL query and returns all fetched rows.
         :param sql: SQL string with optional placeholders
         :param params: tuple of parameters for placeholders
+        :param cached: use the result cache, if the client has one
         """
+        if self.cache is not None and cached:
+            return self._cached("rows", sql, params, lambda: self.query(sql, params, cached=False))
+        start = time.perf_counter()
+        if self.pooled:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, params or ())
+                    rows = cur.fetchall()
+                self._record(conn, sql, params, start, len(rows), result=rows)
+            return rows
         if self.cur is None:
             self.connect()
         self.cur.execute(sql, params or ())
-        return self.cur.fetchall()
+        rows = self.cur.fetchall()
+        self._record(self.conn, sql, params, start, len(rows), result=rows)
+        return rows
+
+    def stream(self, sql, params=None, batch_size=STREAM_BATCH_SIZE, output="rows"):
+        """
+        Runs a query on a named (server-side) cursor and yields its result in batches of
+        `batch_size` rows, so only one batch is held in memory at a time.
+        :param output: "rows" (lists of tuples), "numpy" (dicts of column name -> array)
+                       or "pandas" (DataFrames)
+        """
+        if output not in ("rows", "numpy", "pandas"):
+            raise ValueError(f"Unknown stream output: {output}")
+        with self.connection() as conn:
+            cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+            try:
+                cur.itersize = batch_size
+                cur.execute(sql, params or ())
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    names = [column[0] for column in cur.description]
+                    if output == "pandas":
+                        yield pd.DataFrame.from_records(rows, columns=names)
+                    elif output == "numpy":
+                        yield {name: np.array(values) for name, values in zip(names, zip(*rows))}
+                    else:
+                        yield rows
+            finally:
+                cur.close()
+
+    def query_frame(self, sql, params=None, cached=True):
+        """
+        Runs a SELECT through COPY (...) TO STDOUT and parses the CSV stream with pandas' C
+        reader, so no Python tuple is built per row. Numeric columns come back as int64/float64
+        (float64 with NaN when they hold NULLs) and booleans as bool. Text columns stay strings
+        even when they hold only digits, so codes such as FIPS or LEAID keep their leading zeros.
+        NULL and empty strings both read as NaN.
+        """
+        if self.cache is not None and cached:
+            return self._cached("frame", sql, params, lambda: self.query_frame(sql, params, cached=False))
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                # COPY takes no parameters, so they are inlined with psycopg2's quoting
+                select = cur.mogrify(sql, params).decode() if params else sql
+                select = select.rstrip("; \t\r\n")
+                # The newline keeps a trailing -- comment from swallowing the closing paren. LIMIT 0
+                # returns the column types without running the query, so text columns are known
+                cur.execute(f"SELECT * FROM ({select}\n) AS q LIMIT 0")
+                text_columns = {column.name: str for column in cur.description if column.type_code in TEXT_TYPE_OIDS}
+                cur.copy_expert(f"COPY ({select}\n) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+            buffer.seek(0)
+            frame = pd.read_csv(buffer, dtype=text_columns, keep_default_na=False, na_values=[""],
+                                true_values=["t"], false_values=["f"])
+            self._record(conn, sql, params, start, len(frame), buffer.getbuffer().nbytes)
+        return frame
+
+    def query_arrays(self, sql, params=None, cached=True):
+        """Like query_frame, but returns {column name: NumPy array}."""
+        frame = self.query_frame(sql, params, cached)
+        return {name: frame[name].to_numpy() for name in frame.columns}
 
     def execute(self, sql, params=None):
         """
         Executes a SQL command (INSERT/UPDATE/DELETE).
         Commits immediately.
         """
+        start = time.perf_counter()
+        if self.pooled:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, params or ())
+                    rowcount = cur.rowcount
+                conn.commit()
+                self._record(conn, sql, params, start, rowcount, 0)
+            return
         if self.cur is None:
             self.connect()
         self.cur.execute(sql, params or ())
         self.conn.commit()
+        self._record(self.conn, sql, params, start, self.cur.rowcount, 0)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields a cursor whose statements are committed together at the end of the block
+        (or rolled back if it raises). Pass it as `cur` to insert_many/copy_from to join it.
+        """
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    yield cur
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def _bulk_cursor(self, cur):
+        """`cur` if the caller runs its own transaction, otherwise a new single-commit transaction."""
+        if cur is not None:
+            yield cur
+        else:
+            with self.transaction() as cur:
+                yield cur
+
+    def insert_many(self, table, columns, rows, page_size=INSERT_PAGE_SIZE, cur=None):
+        """
+        Inserts `rows` (sequences in `columns` order) with multi-row INSERT statements of
+        `page_size` rows each, committed once at the end instead of once per row.
+        """
+        statement = pgsql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            table_identifier(table), pgsql.SQL(", ").join(map(pgsql.Identifier, columns))
+        )
+        with self._bulk_cursor(cur) as cur:
+            execute_values(cur, statement.as_string(cur), rows, page_size=page_size)
+
+    def copy_from(self, table, data, columns=None, cur=None):
+        """
+        Loads a DataFrame, or an iterator of rows in `columns` order, through COPY FROM STDIN in
+        one transaction. Rows are encoded as they are read, so an iterator is never materialized;
+        None/NaN load as NULL and empty strings as empty strings (see copy_stream.py).
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = list(data.columns) if columns is None else columns
+            rows = data[columns].itertuples(index=False, name=None)
+        else:
+            rows = data
+        target = table_identifier(table)
+        if columns is not None:
+            target = pgsql.SQL("{} ({})").format(target, pgsql.SQL(", ").join(map(pgsql.Identifier, columns)))
+        with self._bulk_cursor(cur) as cur:
+            statement = pgsql.SQL("COPY {} FROM STDIN WITH (FORMAT csv)").format(target)
+            cur.copy_expert(statement.as_string(cur), CsvRowStream(rows))
 
     def close(self):
-        """Closes cursor and connection."""
+        """Closes cursor and connection (or every pooled connection)."""
+        if self.pool is not None and not self.pool.closed:
+            self.pool.closeall()
         if self.cur:
             self.cur.close()
         if self.conn:
             self.conn.close()
+        if self.cache is not None:
+            self.cache.close()  # Reopened on next use, so a reconnected client keeps its cache
+        if self.query_log is not None:
+            self.query_log.close()
 
     def __enter__(self):
         return self.connect()
@@ -60,7 +323,7 @@ class DatabaseClient:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-# Example usage in a pipeline script:
+# Example usage in a pipeline script (run as `python -m FUNCTION.db_client` from OscarAnalytics):
 if __name__ == '__main__':
     db = DatabaseClient().connect()
     try:
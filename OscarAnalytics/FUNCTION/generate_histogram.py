@@ -1,16 +1,84 @@
+import numpy as np
 import matplotlib.pyplot as plt
 
-def generate_histogram_from_query(db, query, bins=30, title=None, xlabel=None, ylabel=None):
+def histogram_bins(db, query, bins=30, percentile_edges=False):
     """
-    1) Execute `query` via DatabaseClient `db` (must return one numeric column).
-    2) Fetch the first column of each row (skipping NULLs), cast to float.
-    3) Plot a histogram of those values.
+    Bin the first column of `query` inside the database and return (edges, counts) as NumPy
+    arrays; only one row per bin is fetched. NULLs are skipped.
+    Bins are equal-width between the column's min and max (width_bucket), or with
+    percentile_edges=True bounded by the column's 0, 1/bins, ..., 1 percentiles
+    (percentile_cont), so each holds about the same number of rows.
     """
-    rows = db.query(query)
-    data = [float(r[0]) for r in rows if r[0] is not None]
+    source = query.rstrip("; \t\r\n")
+    # The alias list renames only the first column, whatever the query calls it; the newline keeps
+    # a trailing -- comment from swallowing the closing paren
+    data = f"SELECT value::double precision AS value FROM ({source}\n) AS q(value) WHERE value IS NOT NULL"
+    if percentile_edges:
+        fractions = ", ".join(repr(i / bins) for i in range(bins + 1))
+        sql = f"""
+        WITH data AS ({data}),
+             edges AS (SELECT percentile_cont(ARRAY[{fractions}]::double precision[])
+                              WITHIN GROUP (ORDER BY value) AS edges FROM data)
+        SELECT e.edges, LEAST(width_bucket(d.value, e.edges), {bins}) AS bucket, count(*)
+          FROM data d CROSS JOIN edges e
+         GROUP BY e.edges, bucket ORDER BY bucket;
+        """
+    else:
+        sql = f"""
+        WITH data AS ({data}),
+             bounds AS (SELECT min(value) AS lo, max(value) AS hi FROM data)
+        SELECT ARRAY[b.lo, b.hi],
+               CASE WHEN b.hi = b.lo THEN 1 ELSE LEAST(width_bucket(d.value, b.lo, b.hi, {bins}), {bins}) END AS bucket,
+               count(*)
+          FROM data d CROSS JOIN bounds b
+         GROUP BY b.lo, b.hi, bucket ORDER BY bucket;
+        """
+    rows = db.query(sql)
+    if not rows:
+        return np.array([]), np.array([])
+    bounds = rows[0][0]
+    if percentile_edges:
+        edges = np.array(bounds, dtype=float)
+    elif bounds[0] == bounds[1]:
+        edges = np.array([bounds[0] - 0.5, bounds[0] + 0.5])
+    else:
+        edges = np.linspace(bounds[0], bounds[1], bins + 1)
+    counts = np.zeros(len(edges) - 1)
+    for _, bucket, count in rows:
+        counts[bucket - 1] += count
+    if percentile_edges:
+        if edges[0] == edges[-1]:
+            return np.array([edges[0] - 0.5, edges[0] + 0.5]), np.array([counts.sum()])
+        # Repeated percentiles leave zero-width bins: empty ones, or at the top the bin that
+        # width_bucket put the maximum in. Fold them into the bin below and drop them.
+        widths = np.diff(edges)
+        for i in range(len(counts) - 1, 0, -1):
+            if widths[i] == 0:
+                counts[i - 1] += counts[i]
+        keep = widths > 0
+        edges = np.append(edges[:-1][keep], edges[-1])
+        counts = counts[keep]
+    return edges, counts
 
+def generate_histogram_from_query(db, query, bins=30, title=None, xlabel=None, ylabel=None,
+                                  in_database=False, percentile_edges=False):
+    """
+    1) Execute `query` via DatabaseClient `db` (must return one numeric column).
+    2) Fetch the first column as a float array through COPY (skipping NULLs), or with
+       in_database=True only the bin counts (see histogram_bins).
+    3) Plot a histogram of those values. With percentile_edges=True (binned in the database) bars
+       have unequal widths and show count per unit of x instead of count.
+    """
     fig, ax = plt.subplots(figsize=(8, 5))
-    ax.hist(data, bins=bins, alpha=0.7, edgecolor='black')
+    if in_database or percentile_edges:
+        edges, counts = histogram_bins(db, query, bins, percentile_edges)
+        heights = counts / np.diff(edges) if percentile_edges else counts
+        ax.bar(edges[:-1], heights, width=np.diff(edges), align='edge', alpha=0.7, edgecolor='black')
+    else:
+        columns = db.query_arrays(query)
+        values = next(iter(columns.values())).astype(float)
+        data = values[~np.isnan(values)]
+        ax.hist(data, bins=bins, alpha=0.7, edgecolor='black')
     if title:  ax.set_title(title)
     if xlabel: ax.set_xlabel(xlabel)
     if ylabel: ax.set_ylabel(ylabel)
@@ -0,0 +1,166 @@
+import os
+import copy
+import json
+import time
+import zlib
+import pickle
+import sqlite3
+import hashlib
+import threading
+import psycopg2
+from collections import OrderedDict
+
+"""
+Result cache for DatabaseClient.query/query_frame, so plotting scripts that re-run the same
+set-returning functions (e.g. GetCountyPovertyStats) get their rows back without executing the SQL.
+
+Results are kept in memory (the MEMORY_ENTRIES most recently used) and pickled, zlib-compressed,
+into a SQLite file, keyed on the database, the SQL text, its parameters and the data version. The
+data version is a counter in crdc_import.data_version that the import scripts bump after loading
+data, so any import invalidates every cached result. Entries also expire after CACHE_TTL_SECONDS, and the file is
+kept under CACHE_MAX_BYTES by evicting the least recently used entries.
+"""
+
+CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "query_cache.sqlite")
+CACHE_TTL_SECONDS = 24 * 3600
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+MEMORY_ENTRIES = 64
+
+DATA_VERSION_TABLE = "crdc_import.data_version"
+BUMP_DATA_VERSION_SQL = f"""
+CREATE SCHEMA IF NOT EXISTS crdc_import;
+CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version BIGINT NOT NULL,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+INSERT INTO {DATA_VERSION_TABLE} (version) VALUES (1)
+ON CONFLICT (id) DO UPDATE SET version = data_version.version + 1, updated_at = now();
+"""
+
+def bump_data_version(cur):
+    """Invalidate cached query results; run on the cursor of the transaction that loads the data."""
+    cur.execute(BUMP_DATA_VERSION_SQL)
+
+class QueryCache:
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES,
+                 memory_entries=MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()  # key -> (stored, value), most recently used last
+        self.lock = threading.Lock()  # Pooled clients share one cache between threads
+        self.connection = None  # Opened on first use, and again after close()
+
+    def _db(self):
+        """The SQLite connection, opened if needed; call with the lock held."""
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, sql TEXT, body BLOB, stored REAL, accessed REAL, size INTEGER)"
+            )
+            self.connection.commit()
+        return self.connection
+
+    def key(self, kind, sql, params, version, database=None):
+        """
+        Cache key for a result: how it was fetched, the SQL, its parameters, the data version and
+        the database it came from (e.g. host, port, dbname and user), since clients of different
+        databases share the cache file and their data versions can coincide.
+        """
+        return hashlib.sha256(json.dumps([kind, sql.strip(), repr(params), version, database]).encode()).hexdigest()
+
+    def data_version(self, conn):
+        """
+        Current data version on `conn`; 0 until an import script has bumped it. A missing table is
+        rolled back to a savepoint, so a transaction the caller has open on `conn` is kept.
+        """
+        with conn.cursor() as cur:
+            if conn.autocommit:
+                try:
+                    cur.execute(f"SELECT version FROM {DATA_VERSION_TABLE}")
+                    row = cur.fetchone()
+                except psycopg2.errors.UndefinedTable:
+                    row = None
+            else:
+                cur.execute("SAVEPOINT data_version")
+                try:
+                    cur.execute(f"SELECT version FROM {DATA_VERSION_TABLE}")
+                    row = cur.fetchone()
+                except psycopg2.errors.UndefinedTable:
+                    cur.execute("ROLLBACK TO SAVEPOINT data_version")
+                    row = None
+                cur.execute("RELEASE SAVEPOINT data_version")
+        return row[0] if row else 0
+
+    def get(self, key):
+        """The cached value for `key` (a copy, safe to modify), or None if missing or expired."""
+        with self.lock:
+            db = self._db()
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+            else:
+                row = db.execute("SELECT body, stored FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                entry = (row[1], pickle.loads(zlib.decompress(row[0])))
+                self._remember(key, entry)
+            if time.time() - entry[0] >= self.ttl:
+                self.memory.pop(key, None)
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+                db.commit()
+                return None
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+        return copy.copy(entry[1])
+
+    def put(self, key, sql, value):
+        body = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        now = time.time()
+        with self.lock:
+            db = self._db()
+            self._remember(key, (now, copy.copy(value)))
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, sql, body, stored, accessed, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, sql, body, now, now, len(body)),
+            )
+            db.commit()
+            self._evict()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop least recently used entries until the file is below 90% of max_bytes."""
+        db = self._db()
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, size in db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.memory.pop(key, None)
+            total -= size
+        db.commit()
+
+    def clear(self):
+        with self.lock:
+            db = self._db()
+            self.memory.clear()
+            db.execute("DELETE FROM results")
+            db.commit()
+
+    def close(self):
+        """Release the SQLite file; the cache reopens it when it is used again."""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import hashlib
+import threading
+import psycopg2
+
+"""
+Query instrumentation for DatabaseClient: every query/execute/query_frame is appended to a JSONL
+log with its statement text, a hash of its parameters, latency and rows returned. Statements
+slower than SLOW_QUERY_SECONDS also get the bytes they returned and their plan: queries are run
+again under EXPLAIN (ANALYZE, BUFFERS) inside a savepoint that is rolled back, so the caller's
+transaction is left as it was, while INSERT/UPDATE/DELETE only get a plain EXPLAIN and are never run
+twice. A per-statement summary (calls, total and worst time) is printed when the process exits;
+bytes are only summed for statements whose every call had them measured (see measure_bytes).
+
+Run `python query_log.py [query_log.jsonl]` to summarize a log across runs.
+"""
+
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "query_log.jsonl")
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "1.0"))
+SUMMARY_LIMIT = 10  # Statements shown in the summary
+EXPLAINABLE = ("SELECT", "WITH", "VALUES", "TABLE", "INSERT", "UPDATE", "DELETE")
+# Statements that write are explained without ANALYZE, which would run them again
+WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+def statement_text(sql):
+    """The statement with whitespace collapsed, so the same SQL groups together however it was formatted."""
+    return re.sub(r"\s+", " ", sql).strip()
+
+def params_hash(params):
+    return hashlib.sha256(repr(params).encode()).hexdigest()[:16] if params else None
+
+def summarize(records, limit=SUMMARY_LIMIT):
+    """
+    [(statement, calls, total seconds, max seconds, rows, bytes, slow calls)], most total time first.
+    Bytes is None for a statement if any of its calls was logged without them.
+    """
+    stats = {}
+    for record in records:
+        entry = stats.setdefault(record["statement"], [0, 0.0, 0.0, 0, 0, 0])
+        entry[0] += 1
+        entry[1] += record["seconds"]
+        entry[2] = max(entry[2], record["seconds"])
+        entry[3] += record["rows"] or 0
+        entry[4] = None if entry[4] is None or record["bytes"] is None else entry[4] + record["bytes"]
+        entry[5] += record["slow"]
+    ranked = sorted(stats.items(), key=lambda item: item[1][1], reverse=True)
+    return [(statement, *entry) for statement, entry in ranked[:limit]]
+
+def print_summary(summary, file=sys.stdout):
+    """Print the summary; the bytes column is left out if no statement had bytes for every call."""
+    if not summary:
+        return
+    show_bytes = any(entry[5] is not None for entry in summary)
+    bytes_header = f" {'bytes':>11}" if show_bytes else ""
+    print(f"{'calls':>6} {'total s':>9} {'max s':>8} {'rows':>9}{bytes_header} {'slow':>5}  statement", file=file)
+    for statement, calls, total, worst, rows, nbytes, slow in summary:
+        text = statement if len(statement) <= 80 else statement[:77] + "..."
+        nbytes = f" {'-' if nbytes is None else nbytes:>11}" if show_bytes else ""
+        print(f"{calls:>6} {total:>9.3f} {worst:>8.3f} {rows:>9}{nbytes} {slow:>5}  {text}", file=file)
+
+class QueryLog:
+    def __init__(self, path=QUERY_LOG_PATH, slow_seconds=SLOW_QUERY_SECONDS, explain=True,
+                 summary_at_exit=True, measure_bytes=False):
+        self.path = path
+        self.slow_seconds = slow_seconds
+        self.explain = explain
+        self.measure_bytes = measure_bytes  # Measure result bytes of every statement, not only slow ones
+        self.records = []  # This run's records, for the summary
+        self.lock = threading.Lock()  # Pooled clients log from several threads
+        self.file = None  # Opened on first write, and again after close()
+        if summary_at_exit:
+            atexit.register(self.print_summary)
+
+    def record(self, conn, sql, params, seconds, rows, nbytes=None, result=None):
+        """
+        Log one statement; if it was slow, capture its plan on `conn` first. `result` (the fetched
+        rows) is only walked to measure bytes when the statement was slow or measure_bytes is set.
+        """
+        slow = seconds >= self.slow_seconds
+        if nbytes is None and result is not None and (slow or self.measure_bytes):
+            nbytes = self.result_bytes(result)
+        record = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "statement": statement_text(sql),
+            "params_hash": params_hash(params),
+            "seconds": round(seconds, 6),
+            "rows": rows,
+            "bytes": nbytes,
+            "slow": slow,
+        }
+        if slow and self.explain:
+            record["plan"] = self.explain_plan(conn, sql, params)
+        with self.lock:
+            self.records.append(record)
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def result_bytes(self, rows):
+        """Approximate size of fetched rows as text, close to what crossed the wire."""
+        return sum(len(str(value)) for row in rows for value in row if value is not None)
+
+    def explain_plan(self, conn, sql, params):
+        """
+        Plan lines for `sql`, or None if it cannot be explained. Queries get EXPLAIN (ANALYZE,
+        BUFFERS), which runs them again, so it runs inside a savepoint that is rolled back, or in a
+        transaction of its own when none is open (autocommit, or the statement already committed);
+        anything the caller has open on `conn` is not touched. Writes only get a plain EXPLAIN.
+        """
+        statement = sql.strip().rstrip(";")
+        if not statement.upper().startswith(EXPLAINABLE) or ";" in statement:
+            return None
+        explain = "EXPLAIN " if WRITES.search(statement) else "EXPLAIN (ANALYZE, BUFFERS) "
+        in_transaction = not conn.autocommit and \
+            conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        with conn.cursor() as cur:
+            if in_transaction:
+                cur.execute("SAVEPOINT explain_plan")
+            elif conn.autocommit:
+                cur.execute("BEGIN")
+            try:
+                cur.execute(explain + statement, params or ())
+                plan = [row[0] for row in cur.fetchall()]
+            except psycopg2.Error as e:
+                plan = [f"EXPLAIN failed: {e}".strip()]
+            if in_transaction:
+                cur.execute("ROLLBACK TO SAVEPOINT explain_plan")
+                cur.execute("RELEASE SAVEPOINT explain_plan")
+            elif conn.autocommit:
+                cur.execute("ROLLBACK")
+        if not in_transaction and not conn.autocommit:
+            conn.rollback()  # Close the transaction the explain opened
+        return plan
+
+    def summary(self, limit=SUMMARY_LIMIT):
+        with self.lock:
+            return summarize(self.records, limit)
+
+    def print_summary(self):
+        summary = self.summary()
+        if summary:
+            print(f"\nQuery summary ({len(self.records)} statements, log in {self.path}):")
+            print_summary(summary)
+
+    def close(self):
+        """Close the log file; it is reopened (appending) if more statements are logged."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else QUERY_LOG_PATH
+    with open(path, encoding="utf-8") as f:
+        print_summary(summarize((json.loads(line) for line in f if line.strip()), limit=None))
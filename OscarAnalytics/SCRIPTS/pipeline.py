@@ -9,16 +9,21 @@ if ROOT not in sys.path:
 
 from FUNCTION.db_client               import DatabaseClient
 from FUNCTION.generate_histogram      import generate_histogram_from_query
+from FUNCTION.query_cache             import QueryCache
+from FUNCTION.query_log               import QueryLog
 
 def main():
     # ensure your DB password env var is set
     os.environ.setdefault("PostgreSQL_PWD", os.getenv("PostgreSQL_PWD",""))
 
-    with DatabaseClient() as db:
+    # Cached results are reused until they expire or an import bumps the data version
+    # Statements are logged to query_log.jsonl (plans of slow ones included), summarized at exit
+    with DatabaseClient(cache=QueryCache(), query_log=QueryLog()) as db:
         sql = 'SELECT varCount FROM crdc_import."GetEnrollmentVariables"();'
         generate_histogram_from_query(
             db, sql,
             bins=30,
+            in_database=True,  # Only the 30 bin counts leave the database
             title="School Enrollment Counts",
             xlabel="Students per School",
             ylabel="Number of Schools"
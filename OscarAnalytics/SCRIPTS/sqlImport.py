@@ -1,4 +1,5 @@
 import os
+import sys
 import csv
 import re
 import zipfile
@@ -7,6 +8,13 @@ import psycopg2
 import pandas as pd
 import argparse
 
+# ─── prepend repo root (where FUNCTION/ lives) to module search path ───
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from FUNCTION.query_cache import bump_data_version
+
 # === CONFIGURATION ===
 PWD = os.getenv("PostgreSQL_PWD")
 DATA_FOLDER = 'data'
@@ -272,6 +280,22 @@ def import_file_as_raw(file_path, config):
         if 'cur' in locals(): cur.close()
         if 'conn' in locals(): conn.close()
 
+# === DATA VERSION ===
+def invalidate_query_cache(config):
+    """Invalidate DatabaseClient query caches (FUNCTION/query_cache.py) after an import."""
+    qualified = f"{SCHEMA_NAME}.data_version"
+    try:
+        conn = psycopg2.connect(**config)
+        cur = conn.cursor()
+        bump_data_version(cur)
+        conn.commit()
+        print(f"[✓] Bumped `{qualified}`; cached query results are stale.")
+    except Exception as e:
+        print(f"[✗] Error bumping `{qualified}`: {e}")
+    finally:
+        if 'cur' in locals(): cur.close()
+        if 'conn' in locals(): conn.close()
+
 # === MAIN WORKFLOW ===
 def main():
     # 0) ensure target schema exists
@@ -309,5 +333,8 @@ def main():
             else:
                 import_file_as_raw(path, POSTGRES_CONFIG)
 
+    # 5) invalidate cached query results
+    invalidate_query_cache(POSTGRES_CONFIG)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,57 @@
+import os
+import time
+import argparse
+from mockCensusServer import MockCensusOptions, start_mock_server
+
+"""
+Benchmark of the Census tract fetch paths against the local mock server (mockCensusServer.py).
+
+For the same set of tracts it times the serial fetch_selected_tracts (one request per tract and a
+0.5 s sleep), fetch_selected_tracts_concurrent (thread pool + token bucket) and
+fetch_tracts_by_county (one request per county), and reports requests sent, requests/s and total
+time. The response cache is not used, so every path hits the server.
+"""
+
+def run(label, fetch, server):
+    start_count = server.RequestHandlerClass.request_count
+    start = time.perf_counter()
+    df = fetch()
+    elapsed = time.perf_counter() - start
+    requests_sent = server.RequestHandlerClass.request_count - start_count
+    print(f"{label:<28} {len(df):>7} rows {requests_sent:>7} requests {requests_sent / elapsed:>9.1f} req/s {elapsed:>9.2f} s")
+    return elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Census fetch paths against a local mock API")
+    parser.add_argument('--states', type=int, default=2)
+    parser.add_argument('--counties', type=int, default=3, help="counties per state")
+    parser.add_argument('--tracts', type=int, default=10, help="tracts per county")
+    parser.add_argument('--latency', type=float, default=0.05, help="mock server seconds per response")
+    parser.add_argument('--rate-limit', type=float, default=None, help="mock server requests per second before 429s")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--client-rate', type=float, default=10.0, help="client token bucket, requests per second")
+    parser.add_argument('--skip-serial', action='store_true', help="skip the slow serial path")
+    args = parser.parse_args()
+
+    options = MockCensusOptions(args.states, args.counties, args.tracts, latency=args.latency,
+                                rate_limit=args.rate_limit, error_rate=args.error_rate)
+    server, host = start_mock_server(options)
+    os.environ['CENSUS_API_HOST'] = host  # Read when census_client is imported
+    import getBoCTractsData
+    from census_client import CensusClient
+
+    tracts = [(state, county, tract) for state in options.state_codes()
+              for county in options.county_codes() for tract in options.tract_codes()]
+    print(f"Mock API at {host}: {len(tracts)} tracts, {args.latency * 1000:.0f} ms latency\n")
+
+    def client():
+        return CensusClient(max_workers=args.workers, rate=args.client_rate, burst=args.workers)
+
+    if not args.skip_serial:
+        run("serial (0.5 s sleep)", lambda: getBoCTractsData.fetch_selected_tracts(tracts), server)
+    with client() as c:
+        run("concurrent per tract", lambda: getBoCTractsData.fetch_selected_tracts_concurrent(tracts, client=c), server)
+    with client() as c:
+        run("concurrent per county", lambda: getBoCTractsData.fetch_tracts_by_county(tracts, client=c), server)
+    server.shutdown()
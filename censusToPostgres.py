@@ -0,0 +1,162 @@
+import os
+import psycopg2
+from concurrent.futures import ThreadPoolExecutor
+from census_client import default_client
+from census_types import get_variable_metadata
+from getBoCTractsData import BASE_URL, VARIABLES_URL, VARIABLES, CENSUS_API_KEY
+from getBoCTractsPerCounty import STATE, COUNTY
+from OscarAnalytics.FUNCTION.copy_stream import CsvRowStream
+from OscarAnalytics.FUNCTION.query_cache import bump_data_version
+
+"""
+Load Census tract data straight into PostgreSQL, without intermediate CSV files.
+
+County pages are fetched concurrently (census_client.CensusClient) and streamed, as they arrive,
+through COPY FROM STDIN into a typed, session-private temporary staging table. Once every page is
+staged, crdc_import.census_tracts gains any missing columns and the staging rows are upserted into
+it on GEOID, so reloading a county updates its rows in place and the data is queryable as soon as
+the load commits. If any county fails to fetch, nothing is committed.
+"""
+
+PWD = os.getenv("PostgreSQL_PWD")
+SCHEMA_NAME = 'crdc_import'
+TABLE_NAME = 'census_tracts'
+STAGING_TABLE = 'census_tracts_staging'
+GEOGRAPHY_COLUMNS = ['state', 'county', 'tract']
+
+POSTGRES_CONFIG = {
+    'dbname':   'postgres',
+    'user':     'postgres',
+    'password': PWD,
+    'host':     'localhost',
+    'port':     '5432'
+}
+
+SQL_TYPES = {'int': 'BIGINT', 'float': 'DOUBLE PRECISION'}
+
+def column_name(variable):
+    return f'"{variable.lower()}"'
+
+def fetch_pages(client, counties, variables=VARIABLES, failed=None):
+    """
+    Yield the API response of every (state, county) as soon as it is ready, in order. Counties that
+    cannot be fetched are skipped and appended to `failed`.
+    """
+    def fetch(unit):
+        state, county = unit
+        params = {'get': variables, 'for': 'tract:*', 'in': f'state:{state} county:{county}', 'key': CENSUS_API_KEY}
+        try:
+            return client.get_json(BASE_URL, params)
+        except Exception as e:
+            print(f"[✗] Error retrieving county {state}{county}: {e}")
+            if failed is not None:
+                failed.append(unit)
+            return None
+
+    with ThreadPoolExecutor(max_workers=client.max_workers) as executor:
+        for page in executor.map(fetch, counties):
+            if page is not None:
+                yield page
+
+def page_rows(pages, header):
+    """Rows (GEOID first) for every page; every page must have the same header."""
+    positions = [header.index(column) for column in GEOGRAPHY_COLUMNS]
+    for page in pages:
+        if page[0] != header:
+            raise ValueError(f"Unexpected columns in page: {page[0]}")
+        for row in page[1:]:
+            # Empty values load as NULL, as they did when the pages were written with csv.writer
+            yield [''.join(row[i] for i in positions)] + [None if value == '' else value for value in row]
+
+def column_definitions(header, metadata):
+    """{column: "column TYPE"} for the header's variables, typed from the API's variable metadata."""
+    definitions = {}
+    for variable in header:
+        predicate = metadata.get(variable, {}).get('predicateType')
+        sql_type = 'TEXT' if variable in GEOGRAPHY_COLUMNS else SQL_TYPES.get(predicate, 'TEXT')
+        definitions[variable.lower()] = f"{column_name(variable)} {sql_type}"
+    return definitions
+
+def create_staging_table(cur, definitions):
+    """The staging table is temporary, so concurrent loads each get their own, and dropped on commit."""
+    cur.execute(f"CREATE TEMP TABLE {STAGING_TABLE} (geoid TEXT, " + ", ".join(definitions.values()) + ") ON COMMIT DROP;")
+
+def ensure_target_table(cur, definitions):
+    """
+    Create the target table (GEOID primary key) if needed and add columns for variables it lacks.
+    ALTER TABLE locks out every reader until commit, so it only runs for columns that are missing.
+    """
+    qualified = f"{SCHEMA_NAME}.{TABLE_NAME}"
+    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_NAME};")
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {qualified} (geoid TEXT PRIMARY KEY, "
+        + ", ".join(definitions.values()) + ", loaded_at TIMESTAMPTZ DEFAULT now());"
+    )
+    cur.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s;",
+        (SCHEMA_NAME, TABLE_NAME)
+    )
+    existing = {row[0] for row in cur.fetchall()}
+    for column, definition in definitions.items():
+        if column not in existing:
+            cur.execute(f"ALTER TABLE {qualified} ADD COLUMN {definition};")
+
+def upsert_from_staging(cur, header):
+    columns = ["geoid"] + [column_name(variable) for variable in header]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns[1:])
+    cur.execute(
+        f"INSERT INTO {SCHEMA_NAME}.{TABLE_NAME} ({', '.join(columns)}) "
+        f"SELECT DISTINCT ON (geoid) {', '.join(columns)} FROM {STAGING_TABLE} ORDER BY geoid "
+        f"ON CONFLICT (geoid) DO UPDATE SET {updates}, loaded_at = now();"
+    )
+    return cur.rowcount
+
+def load_counties(counties, client, config=POSTGRES_CONFIG, variables=VARIABLES):
+    """
+    Fetch [(state, county), ...] and upsert their tracts into crdc_import.census_tracts. Returns the
+    row count. Raises, without committing anything, if any county could not be fetched.
+    """
+    failed = []
+    pages = fetch_pages(client, counties, variables, failed)
+    first = next(pages, None)
+    if first is None:
+        if failed:
+            raise RuntimeError(f"Could not fetch counties: {failed}")
+        print("[!] No data retrieved.")
+        return 0
+    header = first[0]
+    metadata = get_variable_metadata(client, VARIABLES_URL)
+
+    def all_pages():
+        yield first
+        yield from pages
+
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cur:
+            definitions = column_definitions(header, metadata)
+            create_staging_table(cur, definitions)
+            columns = ", ".join(["geoid"] + [column_name(variable) for variable in header])
+            # Pages are encoded and sent while later counties are still being fetched
+            cur.copy_expert(
+                f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH CSV",
+                CsvRowStream(page_rows(all_pages(), header))
+            )
+            if failed:
+                raise RuntimeError(f"Could not fetch counties, nothing loaded: {failed}")
+            # The target table is only touched once every page is staged, to keep its locks short
+            ensure_target_table(cur, definitions)
+            count = upsert_from_staging(cur, header)
+            bump_data_version(cur)  # Cached DatabaseClient results go stale with this commit
+        conn.commit()
+        print(f"[✓] Upserted {count} tracts into `{SCHEMA_NAME}.{TABLE_NAME}`.")
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    with default_client() as client:
+        load_counties([(STATE, COUNTY)], client)
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+"""
+Persistent response cache for the Census API, shared by the getBoCTracts*.py scripts through
+census_client.CensusClient.
+
+Responses are stored zlib-compressed in a SQLite file, keyed on the request URL (dataset) and its
+query parameters (variables and geography) with the API key left out, so runs with different keys
+share entries. An entry is served without a request for CACHE_TTL_SECONDS; after that it is
+revalidated with its ETag when the server sent one. The file is kept under CACHE_MAX_BYTES by
+evicting the least recently used entries. With CENSUS_OFFLINE=1 every request must be answered
+from the cache, however old the entry.
+"""
+
+CACHE_PATH = os.getenv("CENSUS_CACHE_PATH", "census_cache.sqlite")
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+EXCLUDED_PARAMS = {"key"}
+
+class CacheMiss(Exception):
+    pass
+
+class CacheEntry:
+    def __init__(self, key, body, etag, stored):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.stored = stored
+
+    def json(self):
+        return json.loads(self.body)
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES, offline=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = os.getenv("CENSUS_OFFLINE") == "1" if offline is None else offline
+        self.lock = threading.Lock()  # One connection shared by the fetch threads
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, body BLOB, etag TEXT, stored REAL, accessed REAL, size INTEGER)"
+        )
+        self.connection.commit()
+
+    def key(self, url, params=None):
+        """Cache key for a request: the URL plus its parameters, sorted, without the API key."""
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if k not in EXCLUDED_PARAMS)
+        return hashlib.sha256(json.dumps([url, items]).encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT body, etag, stored FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        return CacheEntry(key, zlib.decompress(row[0]), row[1], row[2])
+
+    def is_fresh(self, entry):
+        return self.offline or time.time() - entry.stored < self.ttl
+
+    def put(self, key, url, body, etag=None):
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, url, body, etag, stored, accessed, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, compressed, etag, now, now, len(compressed)),
+            )
+            self.connection.commit()
+            self._evict()
+
+    def touch(self, key):
+        """Mark an entry as revalidated (the server answered 304 Not Modified)."""
+        now = time.time()
+        with self.lock:
+            self.connection.execute("UPDATE responses SET stored = ?, accessed = ? WHERE key = ?", (now, now, key))
+            self.connection.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is below 90% of max_bytes."""
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, size in self.connection.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+        self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
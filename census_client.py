@@ -0,0 +1,162 @@
+import os
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from census_cache import ResponseCache, CacheMiss
+
+"""
+Shared HTTP plumbing for the getBoCTracts*.py scripts.
+
+CensusClient keeps one keep-alive requests.Session for all calls, spaces requests with a token
+bucket instead of sleeping after each one, retries throttled (429) and server (5xx) errors with
+exponential backoff, and runs many requests at once on a thread pool with map(). Given a
+census_cache.ResponseCache, responses are served from and stored to disk.
+"""
+
+# CENSUS_API_HOST can point the scripts at a local stand-in (see mockCensusServer.py)
+CENSUS_API_HOST = os.getenv("CENSUS_API_HOST", "https://api.census.gov")
+DATASET = '2020/dec/pl'
+BASE_URL = f'{CENSUS_API_HOST}/data/{DATASET}'
+VARIABLES_URL = f'{BASE_URL}/variables.json'
+
+MAX_WORKERS = 8              # Requests in flight at once
+REQUESTS_PER_SECOND = 10.0   # Sustained request rate; short bursts up to BURST_SIZE are allowed
+BURST_SIZE = 10
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0        # First retry delay; doubled on every further attempt
+REQUEST_TIMEOUT = 60
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def is_cacheable(data):
+    """True for the documents the API answers successfully with: a list of rows (header first) or a
+    metadata object such as variables.json."""
+    if isinstance(data, list):
+        return bool(data) and all(isinstance(row, list) for row in data)
+    return isinstance(data, dict)
+
+class TokenBucket:
+    """Thread-safe rate limiter: acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class CensusClient:
+    def __init__(self, max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND, burst=BURST_SIZE,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, cache=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate, burst)
+        # One connection per worker, reused across requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, url, params=None):
+        """GET `url` and return the decoded JSON, retrying transient failures."""
+        entry = None
+        headers = {}
+        if self.cache is not None:
+            entry = self.cache.get(self.cache.key(url, params))
+            if entry is not None and self.cache.is_fresh(entry):
+                try:
+                    return entry.json()
+                except ValueError:
+                    entry = None  # A body cached before responses were checked; fetch it again
+            if self.cache.offline:
+                raise CacheMiss(f"Offline and not cached: {url} {params}")
+            if entry is not None and entry.etag:
+                headers["If-None-Match"] = entry.etag
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            retry_after = None
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 304 and entry is not None:
+                    self.cache.touch(entry.key)
+                    return entry.json()
+                if response.status_code == 200:
+                    # Errors such as an invalid key come back as 200 with an HTML page; never cache those
+                    try:
+                        data = response.json()
+                    except ValueError:
+                        raise Exception(f"Response is not JSON: {response.text[:200]}")
+                    if self.cache is not None and is_cacheable(data):
+                        key = self.cache.key(url, params)
+                        self.cache.put(key, url, response.content, response.headers.get("ETag"))
+                    return data
+                if response.status_code not in RETRY_STATUS:
+                    raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+                error = f"status code {response.status_code}: {response.text}"
+                retry_after = response.headers.get("Retry-After")
+            if attempt < self.max_retries:
+                if retry_after is not None and retry_after.isdigit():
+                    delay = float(retry_after)
+                else:
+                    delay = self.backoff * 2 ** attempt * (1 + random.random())  # Jitter spreads retries out
+                time.sleep(delay)
+        raise Exception(f"Request failed after {self.max_retries + 1} attempts: {error}")
+
+    def map(self, func, items):
+        """
+        Call func(item) for every item on the thread pool. Returns (item, result, error) tuples in
+        the order of `items`; error is None on success.
+        """
+        def run(item):
+            try:
+                return item, func(item), None
+            except Exception as e:
+                return item, None, e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def default_client(**kwargs):
+    """A CensusClient with the shared on-disk response cache, as used by the scripts' main blocks."""
+    return CensusClient(cache=ResponseCache(), **kwargs)
+
+@contextmanager
+def client_or_default(client=None, **kwargs):
+    """`client` if one was passed, otherwise a default_client(**kwargs) closed at the end of the block."""
+    if client is not None:
+        yield client
+        return
+    with default_client(**kwargs) as client:
+        yield client
@@ -0,0 +1,71 @@
+import os
+import importlib.util
+import pandas as pd
+
+"""
+Typed, columnar storage for Census API results.
+
+The API returns every value as a string. to_typed_frame() converts each column using the dataset's
+variables.json metadata ("predicateType" int/float/string): estimates become nullable integers or
+floats, geography codes become categoricals, and a GEOID column (state + county + tract) is added.
+write_columnar() saves the result as zstd-compressed Parquet or Feather (by file extension), and
+read_columnar() loads it back through a memory map, optionally reading only some columns.
+Parquet/Feather need pyarrow.
+"""
+
+GEOGRAPHY_COLUMNS = ['state', 'county', 'tract', 'block group', 'block', 'place', 'us']
+GEOID_PARTS = ['state', 'county', 'tract']
+COMPRESSION = 'zstd'
+
+def get_variable_metadata(client, variables_url):
+    """{variable name: metadata dict} from a dataset's variables.json (cached by census_client)."""
+    return client.get_json(variables_url)['variables']
+
+def to_typed_frame(df, metadata):
+    """Return a copy of the string DataFrame `df` with typed columns and a GEOID column."""
+    typed = {}
+    for column in df.columns:
+        values = df[column]
+        predicate = metadata.get(column, {}).get('predicateType')
+        if column in GEOGRAPHY_COLUMNS:
+            typed[column] = values.astype('category')
+        elif predicate == 'int':
+            typed[column] = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif predicate == 'float':
+            typed[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            typed[column] = values.astype('string')
+    result = pd.DataFrame(typed, index=df.index)
+    if all(part in df.columns for part in GEOID_PARTS):
+        result.insert(0, 'GEOID', (df['state'] + df['county'] + df['tract']).astype('string'))
+    return result
+
+def write_columnar(df, path):
+    """Write `df` as compressed Parquet (.parquet) or Feather (.feather/.arrow)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        df.to_parquet(path, compression=COMPRESSION, index=False)
+    elif extension in ('.feather', '.arrow'):
+        df.reset_index(drop=True).to_feather(path, compression=COMPRESSION)
+    else:
+        raise ValueError(f"Unsupported columnar format: {path}")
+
+def read_columnar(path, columns=None):
+    """Read a file written by write_columnar, memory-mapped, optionally only `columns`."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    if extension in ('.feather', '.arrow'):
+        from pyarrow import feather
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    raise ValueError(f"Unsupported columnar format: {path}")
+
+def save_results(df, client, variables_url, base_name):
+    """Save fetch results as typed Parquet, or as CSV like before if pyarrow is not installed."""
+    if importlib.util.find_spec("pyarrow") is None:
+        df.to_csv(f'{base_name}.csv', index=False)
+        print(f"pyarrow is not installed; wrote {base_name}.csv instead of Parquet")
+        return f'{base_name}.csv'
+    typed = to_typed_frame(df, get_variable_metadata(client, variables_url))
+    write_columnar(typed, f'{base_name}.parquet')
+    return f'{base_name}.parquet'
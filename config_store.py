@@ -0,0 +1,147 @@
+import os
+import json
+import threading
+from json_journal import PatchJournal, apply_patch, atomic_write_json, file_stamp
+
+"""
+Shared access to a CHIMP configuration file (MODELS / TASKS / CONFIG). One ConfigStore exists per
+file path in a process, so consensus.py and every CHIMPInterface window see the same parsed data.
+
+1. Tasks are indexed by a stable "id" field. Tasks without one get "task-<n>" the first time the
+   file is opened, and the ids are written back so they survive restarts and reordering.
+2. Edits are patches (see json_journal.py): journaled first, applied in memory, then the file is
+   replaced atomically. The journal is "<file>.config-journal", separate from editJSON's.
+3. Readers call refresh(), which only re-parses the file when its mtime/size changed, and
+   subscribers are notified whenever the data changes.
+"""
+
+JOURNAL_SUFFIX = ".config-journal"
+
+class ConfigStore:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, file_name):
+        """Return the shared store for `file_name`, creating it on first use."""
+        key = os.path.abspath(file_name)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(key)
+            return cls._instances[key]
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.journal = PatchJournal(f"{file_name}{JOURNAL_SUFFIX}", file_name)
+        self.data = {}
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._task_index = {}
+        self._stamp = None
+        self.reload()
+
+    def reload(self):
+        """Parse the file, replay any journaled patches left by a crash and rebuild the index."""
+        with self._lock:
+            with open(self.file_name, 'r') as file:
+                data = json.load(file)
+            replayed = self.journal.replay(data)
+            self.data = data
+            missing_ids = self._index_tasks()
+            if replayed or missing_ids:
+                self._write()
+            self._stamp = file_stamp(self.file_name)
+
+    def _index_tasks(self):
+        """Map task id -> position in TASKS, assigning ids where missing. Returns True if any were assigned."""
+        tasks = self.data.get("TASKS", [])
+        used = {task["id"] for task in tasks if "id" in task}
+        counter = len(used)
+        assigned = False
+        for task in tasks:
+            if "id" not in task:
+                counter += 1
+                while f"task-{counter}" in used:
+                    counter += 1
+                task["id"] = f"task-{counter}"
+                used.add(task["id"])
+                assigned = True
+        self._task_index = {task["id"]: i for i, task in enumerate(tasks)}
+        return assigned
+
+    def _write(self):
+        atomic_write_json(self.file_name, self.data)
+        self.journal.clear()
+        self._stamp = file_stamp(self.file_name)
+
+    def has_changed(self):
+        """True if the file on disk is not the one this store last read or wrote."""
+        return file_stamp(self.file_name) != self._stamp
+
+    def refresh(self):
+        """Re-read the file only if it changed on disk. Returns True if it was reloaded."""
+        with self._lock:
+            if not self.has_changed():
+                return False
+            self.reload()
+        self._notify()
+        return True
+
+    def subscribe(self, callback):
+        """Call `callback(store)` whenever the data changes, locally or on disk."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            callback(self)
+
+    @property
+    def config(self):
+        return self.data.get("CONFIG", {})
+
+    @property
+    def models(self):
+        return self.data.get("MODELS", [])
+
+    def task_ids(self):
+        return [task["id"] for task in self.data.get("TASKS", [])]
+
+    def get_task(self, task_id):
+        index = self._task_index.get(task_id)
+        if index is None:
+            return None
+        return self.data["TASKS"][index]
+
+    def find_task_id(self, request):
+        """Id of the first task whose request text equals `request`, or None."""
+        for task in self.data.get("TASKS", []):
+            if task["request"] == request:
+                return task["id"]
+        return None
+
+    def apply_patches(self, patches):
+        """Journal, apply and persist a list of patches as one atomic update."""
+        with self._lock:
+            self.refresh()
+            self.journal.append(patches)
+            for patch in patches:
+                apply_patch(self.data, patch)
+            self._index_tasks()
+            self._write()
+        self._notify()
+
+    def update_task(self, task_id, **fields):
+        """Set fields of one task, e.g. update_task(task_id, request="...")."""
+        with self._lock:
+            self.refresh()
+            index = self._task_index.get(task_id)
+            if index is None:
+                raise KeyError(f"Unknown task id: {task_id}")
+            self.apply_patches([
+                {"op": "set", "path": ["TASKS", index, field], "value": value}
+                for field, value in fields.items()
+            ])
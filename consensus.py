@@ -1,24 +1,20 @@
 from agents import OpenAIChatbot, ClaudeAgent
 from interface import CHIMPInterface
+from config_store import ConfigStore
 import os
 import sys
 from PyQt5.QtWidgets import QApplication
-import json
 
 
-def load_config(file_name):
-    with open(file_name, 'r') as file:
-        return json.load(file)
-
-     
 def main(file_name):
     # Create task manager
     # task_manager = TaskPipelineManager(file_name)
     
-    config_data = load_config(file_name)
-    models = config_data["MODELS"]
-    tasks = config_data["TASKS"]
-    config = config_data["CONFIG"]
+    # Shared, indexed view of the config file; CHIMPInterface windows edit it in place
+    config_store = ConfigStore.open(file_name)
+    models = config_store.models
+    task_ids = config_store.task_ids()
+    config = config_store.config
     
     agents = []
     for model in models:
@@ -41,24 +37,25 @@ def main(file_name):
     
         
     
-    for k, task in enumerate(tasks):
+    for k, task_id in enumerate(task_ids):
         for i, agent in enumerate(agents):
-            # Reload configuration for each agent-task pair
-            updated_config = load_config(file_name=file_name)
-            updated_tasks = updated_config["TASKS"]
+            # Pick up edits for each agent-task pair; the file is only re-parsed if it changed on disk
+            config_store.refresh()
+            task = config_store.get_task(task_id)
             
-            if len(updated_tasks) <= k:  # Ensure task exists
-                raise ValueError(f"Task index {k} out of range in `updated_tasks`")
+            if task is None:  # Ensure task exists
+                raise ValueError(f"Task {task_id} no longer exists in {file_name}")
 
-            initial_request = updated_tasks[k]['request']
-            initial_instructions = updated_tasks[k]['instructions']
+            initial_request = task['request']
+            initial_instructions = task['instructions']
 
             # Initialize the interface for the current agent and task
             chimp_interface = CHIMPInterface(
                 agent=agent,
                 initial_request=initial_request,
                 initial_instructions=initial_instructions,
-                json_file_path=file_name
+                json_file_path=file_name,
+                task_id=task_id
             )
 
             initial_responses = []
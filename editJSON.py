@@ -1,9 +1,20 @@
 import sys
-import json
-from PyQt5.QtWidgets import QApplication, QWidget, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QMenu, QLabel, QSpacerItem, QSizePolicy, QFileDialog, QMessageBox
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QApplication, QWidget, QTreeView, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QCheckBox, QProgressBar, QMenu, QLabel, QSpacerItem, QSizePolicy, QFileDialog, QMessageBox, QLineEdit, QComboBox, QListWidget, QListWidgetItem, QShortcut
+from PyQt5.QtCore import Qt, QModelIndex, QPersistentModelIndex, QTimer
+from PyQt5.QtGui import QFont, QKeySequence
 import os
+from collections import deque
+from json_tree_model import JsonTreeModel
+from json_preview import JsonPreview, PreviewWorker
+from json_save_engine import SaveEngine
+from json_loader import JsonLoader, atomic_write_lazy_json
+from json_search import IndexWorker
+from jsonl_document import JsonlRecords
+import json_journal
+from json_journal import LazyValue
+
+UNDO_LIMIT = 1000  # Edits kept for undo; each step holds only the values its edit replaced
+INDEX_RETRY_LIMIT = 3  # Failed index builds retried in a row before search is given up
 
 class JsonEditorApp(QWidget):
     def __init__(self):
@@ -17,6 +28,22 @@ class JsonEditorApp(QWidget):
             sys.exit()
 
         self.current_item = None
+        self.json_data = None
+        self.loader = None  # Background loader of the current file, while it runs
+        self.loaders = []  # Every loader thread still running, including cancelled ones
+        self.save_engine = None  # Debounced, journaled writer for the open file
+        self.coerce_numerics = True  # Convert numeric strings to numbers as nodes are displayed or edited
+        self.preview = None  # Paginated preview of the selected non-leaf node
+        self.preview_generation = 0  # Bumped whenever the preview is replaced, to drop stale pages
+        self.preview_workers = []
+        self.search_index = None  # Key/value index of the document, once built
+        self.index_worker = None  # Thread building the current index
+        self.index_workers = []  # Every index thread still running, including cancelled ones
+        self.index_generation = 0  # Bumped on every rebuild, to drop stale indexes
+        self.index_failures = 0  # Index builds that failed since the last one that succeeded
+        self.index_on_demand = False  # Large and JSONL documents are only indexed once searched
+        self.undo_stack = deque(maxlen=UNDO_LIMIT)  # Inverse patches of the edits made, newest last
+        self.redo_stack = []  # Patches that redo undone edits, newest last
         self.is_modified = False  # To track if the current leaf is modified
         self.original_font_size = 12  # Original font size for tree view and text area
         self.tree_font_size = self.original_font_size  # Current font size for tree view
@@ -28,15 +55,53 @@ class JsonEditorApp(QWidget):
         # Horizontal layout for tree view and text editor
         side_by_side_layout = QHBoxLayout()
 
-        # Left side: Tree view
+        # Left side: Search and tree view
         left_layout = QVBoxLayout()
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["JSON Structure"])
-        self.tree.itemClicked.connect(self.on_item_clicked)
+
+        # Search over keys and string values; results jump to their node
+        search_layout = QHBoxLayout()
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search keys and values")
+        self.search_box.textChanged.connect(self.run_search)
+        search_layout.addWidget(self.search_box)
+        self.search_mode = QComboBox()
+        self.search_mode.addItems(["Contains", "Starts with"])
+        self.search_mode.currentIndexChanged.connect(self.run_search)
+        search_layout.addWidget(self.search_mode)
+        left_layout.addLayout(search_layout)
+        self.search_results = QListWidget()
+        self.search_results.setVisible(False)  # Only shown while there is a query
+        self.search_results.setMaximumHeight(150)
+        self.search_results.itemClicked.connect(self.on_search_result_clicked)
+        left_layout.addWidget(self.search_results)
+
+        # Rebuilds are delayed so a burst of edits only triggers one
+        self.index_timer = QTimer(self)
+        self.index_timer.setSingleShot(True)
+        self.index_timer.setInterval(1000)
+        self.index_timer.timeout.connect(self.start_indexing)
+
+        # Rows are created by the model only when a node is expanded
+        self.model = JsonTreeModel()
+        self.model.coerce = self.convert_to_numeric
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
+        self.tree.clicked.connect(self.on_item_clicked)
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
         left_layout.addWidget(self.tree)
 
+        # Loading progress and cancellation, hidden while idle
+        load_layout = QHBoxLayout()
+        self.load_progress = QProgressBar()
+        self.load_progress.setVisible(False)
+        load_layout.addWidget(self.load_progress)
+        self.cancel_load_button = QPushButton("Cancel")
+        self.cancel_load_button.setVisible(False)
+        self.cancel_load_button.clicked.connect(self.cancel_load)
+        load_layout.addWidget(self.cancel_load_button)
+        left_layout.addLayout(load_layout)
+
         self.refresh_button = QPushButton("Refresh")
         self.refresh_button.clicked.connect(self.reload_json)
         left_layout.addWidget(self.refresh_button)
@@ -53,6 +118,11 @@ class JsonEditorApp(QWidget):
         self.text_area.textChanged.connect(self.on_text_changed)
         right_layout.addWidget(self.text_area)
 
+        self.load_more_button = QPushButton("Load more")
+        self.load_more_button.setVisible(False)  # Only shown while a preview has more to show
+        self.load_more_button.clicked.connect(self.load_more_preview)
+        right_layout.addWidget(self.load_more_button)
+
         self.save_button = QPushButton("Save")
         self.save_button.setEnabled(False)  # Initially disabled
         self.save_button.clicked.connect(self.save_entry)
@@ -73,6 +143,24 @@ class JsonEditorApp(QWidget):
         self.open_file_button.clicked.connect(self.open_file)
         controls_layout.addWidget(self.open_file_button)
 
+        # Undo/redo of tree edits; the text area keeps its own Ctrl+Z while it has focus
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.setEnabled(False)
+        self.undo_button.clicked.connect(self.undo)
+        controls_layout.addWidget(self.undo_button)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.setEnabled(False)
+        self.redo_button.clicked.connect(self.redo)
+        controls_layout.addWidget(self.redo_button)
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence.Redo, self, self.redo)
+
+        # Numeric string conversion can be switched off for text-heavy files
+        self.coerce_checkbox = QCheckBox("Convert numbers")
+        self.coerce_checkbox.setChecked(self.coerce_numerics)
+        self.coerce_checkbox.toggled.connect(self.set_coerce_numerics)
+        controls_layout.addWidget(self.coerce_checkbox)
+
         # Font size options
         font_label = QLabel("Font size:")
         controls_layout.addWidget(font_label)
@@ -116,14 +204,17 @@ class JsonEditorApp(QWidget):
     def open_file_dialog(self):
         """Open a file dialog to select a JSON file on startup."""
         options = QFileDialog.Options()
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open JSON File", "", "JSON Files (*.json);;All Files (*)", options=options)
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open JSON File", "", "JSON Files (*.json *.jsonl);;JSON Lines (*.jsonl);;All Files (*)", options=options)
         return file_path if file_path else None
 
     def open_file(self):
         """Open a file dialog to select a new JSON file after startup."""
         options = QFileDialog.Options()
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open JSON File", "", "JSON Files (*.json);;All Files (*)", options=options)
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open JSON File", "", "JSON Files (*.json *.jsonl);;JSON Lines (*.jsonl);;All Files (*)", options=options)
         if file_path:
+            # Write pending edits of the current file before switching
+            if self.save_engine is not None:
+                self.save_engine.flush()
             self.json_file_path = file_path
             self.setWindowTitle(f"JSON Editor - {os.path.basename(file_path)}")
             
@@ -131,6 +222,7 @@ class JsonEditorApp(QWidget):
             self.current_item = None
             self.is_modified = False
             self.save_button.setEnabled(False)
+            self.stop_preview()
             self.text_area.clear()
 
             self.load_json()
@@ -145,26 +237,112 @@ class JsonEditorApp(QWidget):
         self.text_area.setStyleSheet("QTextEdit { line-height: 1.5; }")  # Line spacing in text area
 
     def load_json(self):
-        """Load JSON data from the file, clear tree, and populate it."""
-        try:
-            with open(self.json_file_path, 'r') as file:
-                self.json_data = json.load(file)
+        """Start loading the JSON file on a worker thread; the tree is populated when data arrives."""
+        if self.loader is not None:
+            self.loader.cancel()  # Its remaining signals are ignored
+        if isinstance(self.json_data, JsonlRecords):
+            self.json_data.close()
+        self.stop_indexing()
+        self.index_failures = 0
 
-            # Convert all numeric strings to actual numbers in the JSON data
-            self.json_data = self.convert_numerics(self.json_data)
+        self.current_item = None
+        self.json_data = None
+        self.model.set_json_data(None)
+        self.clear_history()
+        self.stop_preview()
+        self.text_area.setText("Loading...")
+        self.load_progress.setValue(0)
+        self.load_progress.setVisible(True)
+        self.cancel_load_button.setVisible(True)
+
+        # Large files are scanned for their top-level entries instead of being parsed up front
+        loader = JsonLoader(self.json_file_path)
+        loader.progress.connect(self.on_load_progress)
+        loader.lazy_root.connect(self.on_lazy_root)
+        loader.entries_found.connect(self.on_entries_found)
+        loader.loaded.connect(self.on_json_loaded)
+        loader.failed.connect(self.on_load_failed)
+        loader.cancelled.connect(self.on_load_cancelled)
+        loader.finished.connect(lambda: self.loaders.remove(loader))
+        self.loader = loader
+        self.loaders.append(loader)
+        loader.start()
+
+    def cancel_load(self):
+        if self.loader is not None:
+            self.loader.cancel()
+
+    def on_load_progress(self, percent):
+        if self.sender() is self.loader:
+            self.load_progress.setValue(percent)
+
+    def on_lazy_root(self, root):
+        if self.sender() is not self.loader:
+            return
+        # Show top-level entries as soon as they are found
+        self.json_data = root
+        self.model.set_json_data(root)
+
+    def on_entries_found(self, entries):
+        if self.sender() is self.loader:
+            self.model.extend_root(entries)
+
+    def on_json_loaded(self, data, lazy):
+        if self.sender() is not self.loader:
+            if isinstance(data, JsonlRecords):
+                data.close()
+            return
+        self.end_load()
+        self.json_data = data
+
+        # Recover edits journaled by a session that ended before they were saved
+        if self.save_engine is not None:
+            self.save_engine.deleteLater()
+        if isinstance(data, JsonlRecords):
+            writer = lambda path, records: records.flush()  # Only changed records are rewritten
+        else:
+            writer = atomic_write_lazy_json if lazy else json_journal.atomic_write_json
+        self.save_engine = SaveEngine(self.json_file_path, lambda: self.json_data, self, writer)
+        self.save_engine.save_failed.connect(self.on_save_failed)
+        replayed = self.save_engine.recover(self.json_data)
+        if replayed:
+            QMessageBox.information(self, "Recovered edits", f"Restored {replayed} unsaved edit(s) from the journal.")
+
+        # Point the tree model at the new document; rows are built lazily on expand
+        if self.model.json_data is not self.json_data or replayed:
+            self.current_item = None
+            self.model.set_json_data(self.json_data)
 
-            # Clear the existing tree to avoid access to deleted items
-            self.tree.clear()
+        # Show the first page of the document; the rest is serialized on demand
+        self.show_preview(self.json_data)
 
-            # Reload the updated JSON tree view
-            self.load_json_into_tree(self.json_data)
+        # Index keys and values for search in the background. Indexing parses every entry and holds
+        # every key and string, so large and JSONL files wait for the first search instead
+        self.index_on_demand = lazy
+        if not self.index_on_demand:
+            self.start_indexing()
 
-            # Refresh the text area with the new JSON content
-            self.text_area.setText(json.dumps(self.json_data, indent=4))
+    def on_load_failed(self, error):
+        if self.sender() is self.loader:
+            self.abandon_load(f"Failed to load JSON: {error}")
 
-        except Exception as e:
-            self.tree.clear()
-            self.text_area.setText(f"Failed to load JSON: {e}")
+    def on_load_cancelled(self):
+        if self.sender() is self.loader:
+            self.abandon_load("Loading cancelled.")
+
+    def abandon_load(self, message):
+        """Drop a partially loaded document so it can never be saved over the file."""
+        self.end_load()
+        self.current_item = None
+        self.json_data = None
+        self.model.set_json_data(None)
+        self.stop_preview()
+        self.text_area.setText(message)
+
+    def end_load(self):
+        self.loader = None
+        self.load_progress.setVisible(False)
+        self.cancel_load_button.setVisible(False)
 
     def reload_json(self):
         """Clear current references and reload JSON data."""
@@ -172,8 +350,13 @@ class JsonEditorApp(QWidget):
         self.current_item = None
         self.is_modified = False
         self.save_button.setEnabled(False)
+        self.stop_preview()
         self.text_area.clear()
 
+        # Write pending edits first so the reload sees them
+        if self.save_engine is not None:
+            self.save_engine.flush()
+
         # Reload the JSON data and refresh the view
         self.load_json()
 
@@ -190,11 +373,17 @@ class JsonEditorApp(QWidget):
             "<br>"
             "• <b>Save Changes:</b> After editing a leaf node, click 'Save' to update the JSON.<br>"
             "<br>"
+            "• <b>Search:</b> Type in the search box to find keys and text values; click a result to jump to its node. "
+            "Large and JSON Lines files are indexed when you first search them.<br>"
+            "<br>"
+            "• <b>Undo/Redo:</b> Use the Undo and Redo buttons (or Ctrl+Z / Ctrl+Y) to step through edits, even after they were saved.<br>"
+            "<br>"
             "• <b>Refresh JSON:</b> Click 'Refresh' to reload the JSON file in case of external modifications.<br>"
             "<br>"
             "• <b>Adjust Font Size:</b> Use the + and - buttons to increase or decrease font size, and the ↻ button to reset to the original size.<br>"
             "<br>"
-            "• <b>Open JSON Files:</b> Click the 'Open File' button to load a new JSON file.<br>"
+            "• <b>Open JSON Files:</b> Click the 'Open File' button to load a new JSON file. "
+            "JSON Lines files (.jsonl) open as a list with one entry per line.<br>"
             "<br>"
             "<i>Note:</i> Only non-nested values (leaf nodes) are editable. Changes to nested structures "
             "need to be made in an external JSON editor.<br>"
@@ -213,61 +402,61 @@ class JsonEditorApp(QWidget):
         msg_box.setStyleSheet("QLabel{min-width: 600px; font-weight: normal;}")  # Set lighter font weight and width
         msg_box.exec_()
 
+    def set_coerce_numerics(self, enabled):
+        """Turn numeric string conversion on or off for nodes displayed or edited from now on."""
+        self.coerce_numerics = enabled
+        self.model.coerce = self.convert_to_numeric if enabled else None
+
     def convert_numerics(self, data):
-        """Recursively convert numeric strings in dictionaries or lists to integers/floats."""
-        if isinstance(data, dict):
-            return {k: self.convert_numerics(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self.convert_numerics(v) for v in data]
-        elif isinstance(data, str):
-            if data.isdigit():
-                return int(data)
-            try:
-                return float(data)
-            except ValueError:
-                return data
-        else:
+        """Convert numeric strings in dictionaries or lists to integers/floats, in place.
+        Walks with an explicit stack so deeply nested documents do not hit the recursion limit."""
+        if isinstance(data, str):
+            return self.convert_to_numeric(data)
+        if not isinstance(data, (dict, list)):
             return data
-
-    def load_json_into_tree(self, data, parent=None):
-        if parent is None:
-            parent = self.tree
-        if isinstance(data, dict):
-            for key, value in data.items():
-                item = QTreeWidgetItem([key])
-                parent.addTopLevelItem(item) if parent is self.tree else parent.addChild(item)
-                if isinstance(value, (dict, list)):  # Only add children for dicts and lists
-                    self.load_json_into_tree(value, item)
-        elif isinstance(data, list):
-            for index, value in enumerate(data):
-                item = QTreeWidgetItem([str(index)])
-                parent.addTopLevelItem(item) if parent is self.tree else parent.addChild(item)
-                if isinstance(value, (dict, list)):  # Only add children for lists of dicts/lists
-                    self.load_json_into_tree(value, item)
+        stack = [data]
+        while stack:
+            container = stack.pop()
+            items = container.items() if isinstance(container, dict) else enumerate(container)
+            for key, value in list(items):
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+                elif isinstance(value, str):
+                    container[key] = self.convert_to_numeric(value)
+        return data
 
     def on_item_clicked(self, item):
         # Check if there are unsaved changes before switching to a new item
         if self.is_modified:
             self.save_entry()
 
-        self.current_item = item
+        # Persistent so it stays valid (or becomes invalid) as rows are added and removed
+        self.current_item = QPersistentModelIndex(item)
         item_path = self.get_item_path(item)
         # Access the selected item's content from the JSON data
         try:
             json_value = self.get_json_value(item_path)
+            # Numeric strings are converted when their node is first displayed
+            if self.coerce_numerics and isinstance(json_value, str):
+                json_value = self.convert_to_numeric(json_value)
+                parent = json_journal.resolve_path(self.json_data, item_path[:-1])
+                if isinstance(parent, (dict, list)):  # Not JSONL records, which would be rewritten
+                    parent[json_journal.container_key(parent, item_path[-1])] = json_value
             # Show the item's value in the text editor
             if isinstance(json_value, str):
+                self.stop_preview()
                 self.text_area.setReadOnly(False)  # Activate text area for editing
                 self.text_area.setText(json_value.replace("\\n", "\n"))
             elif isinstance(json_value, (dict, list)):
                 self.text_area.setReadOnly(True)  # Deactivate text area (non-leaf node)
-                self.text_area.setText(json.dumps(json_value, indent=4))
+                self.show_preview(json_value)
             else:
+                self.stop_preview()
                 self.text_area.setReadOnly(False)  # Activate text area for editing
                 self.text_area.setText(str(json_value))
 
             # Enable the save button only if the item has no children (i.e., it's a leaf node)
-            if item.childCount() == 0:
+            if not self.model.hasChildren(item):
                 self.save_button.setEnabled(True)
                 self.text_area.setReadOnly(False)  # Allow editing
             else:
@@ -277,43 +466,220 @@ class JsonEditorApp(QWidget):
             self.is_modified = False  # Reset the modification flag when switching nodes
 
         except Exception as e:
+            self.stop_preview()
             self.text_area.setReadOnly(True)  # Deactivate text area in case of error
             self.text_area.setText(f"Error: {e}")
             self.save_button.setEnabled(False)
 
+    def show_preview(self, value):
+        """Show the first page of `value` in the read-only text area; 'Load more' fetches the next."""
+        self.stop_preview()
+        if isinstance(value, JsonlRecords):
+            # Records are shown as their lines in the file, without parsing them
+            self.preview = JsonPreview.from_chunks(value.iter_text())
+        else:
+            self.preview = JsonPreview(value)
+        self.load_more_preview()
+
+    def stop_preview(self):
+        """Drop the current preview and clear its text; pages still being built are ignored."""
+        self.preview_generation += 1
+        self.preview = None
+        self.load_more_button.setVisible(False)
+        self.text_area.blockSignals(True)
+        self.text_area.clear()
+        self.text_area.blockSignals(False)
+
+    def load_more_preview(self):
+        if self.preview is None or self.preview.finished:
+            return
+        self.load_more_button.setEnabled(False)
+
+        # Serialize the next page on a worker thread
+        worker = PreviewWorker(self.preview, self.preview_generation)
+        worker.page_ready.connect(self.on_preview_page)
+        worker.finished.connect(lambda: self.preview_workers.remove(worker))
+        self.preview_workers.append(worker)
+        worker.start()
+
+    def on_preview_page(self, generation, text, finished):
+        if generation != self.preview_generation:
+            return  # The selection changed while this page was being built
+        # Appending must not count as an edit of the current node
+        self.text_area.blockSignals(True)
+        cursor = self.text_area.textCursor()
+        cursor.movePosition(cursor.End)
+        cursor.insertText(text)
+        self.text_area.blockSignals(False)
+        self.load_more_button.setVisible(not finished)
+        self.load_more_button.setEnabled(True)
+
     def get_item_path(self, item):
-        path = []
-        while item is not None:
-            path.append(item.text(0))
-            item = item.parent()
-        path.reverse()
-        return path
+        return self.model.path(QModelIndex(item))
 
     def get_json_value(self, path):
-        obj = self.json_data
-        for key in path:
-            if isinstance(obj, list):
-                key = int(key)
-            obj = obj[key]
-        return obj
+        # Parses any still-unparsed entries of a large file along the way
+        return json_journal.resolve_path(self.json_data, path)
 
     def set_json_value(self, path, value):
-        obj = self.json_data
-        for key in path[:-1]:
-            if isinstance(obj, list):
-                key = int(key)
-            obj = obj[key]
-        last_key = path[-1]
-        if isinstance(obj, list):
-            last_key = int(last_key)
-
-        # Convert numeric strings back to numeric types if possible
-        updated_value = self.convert_to_numeric(value)
-        obj[last_key] = updated_value
-
-        # Auto-save if there was a numeric change
-        if value != str(updated_value):
-            self.auto_save_and_reload()
+        # Convert numeric strings back to numeric types if possible; the model refreshes the row
+        updated_value = self.convert_to_numeric(value) if self.coerce_numerics else value
+        self.apply_edit({"op": "set", "path": path, "value": updated_value})
+
+    def apply_edit(self, patch, history=True):
+        """Apply a patch through the tree model (only affected rows change) and queue a save.
+        Returns the inverse patch, which is also pushed on the undo stack unless `history` is False."""
+        if self.loader is not None or self.save_engine is None:
+            QMessageBox.warning(self, "Warning", "The file is still loading; edits are disabled until it is done.")
+            return None
+        inverse = self.model.apply_patch(patch)
+        # An unparsed value points into the file, which the next save rewrites; keep its parsed form
+        if isinstance(inverse.get("value"), LazyValue):
+            inverse["value"] = inverse["value"].load()
+        self.save_engine.record([patch])
+        self.update_search_index(patch)
+        if history:
+            self.undo_stack.append(inverse)
+            self.redo_stack.clear()
+            self.update_history_buttons()
+        return inverse
+
+    def undo(self):
+        """Revert the last edit by applying its inverse patch; it is journaled and saved like any edit."""
+        if self.is_modified:
+            self.save_entry()
+        if not self.undo_stack:
+            return
+        redo_patch = self.apply_edit(self.undo_stack.pop(), history=False)
+        if redo_patch is not None:
+            self.redo_stack.append(redo_patch)
+            self.show_edited_path(redo_patch["path"])
+        self.update_history_buttons()
+
+    def redo(self):
+        if self.is_modified:
+            self.save_entry()
+        if not self.redo_stack:
+            return
+        inverse = self.apply_edit(self.redo_stack.pop(), history=False)
+        if inverse is not None:
+            self.undo_stack.append(inverse)
+            self.show_edited_path(inverse["path"])
+        self.update_history_buttons()
+
+    def clear_history(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.update_history_buttons()
+
+    def update_history_buttons(self):
+        self.undo_button.setEnabled(bool(self.undo_stack))
+        self.redo_button.setEnabled(bool(self.redo_stack))
+
+    def show_edited_path(self, path):
+        """Select the node an undo/redo changed, or its parent if the node is gone."""
+        if not self.select_path(path):
+            self.current_item = None
+            self.stop_preview()
+            self.save_button.setEnabled(False)
+            if path[:-1]:
+                self.select_path(path[:-1])
+
+    def start_indexing(self):
+        """Build the search index of the current document on a worker thread."""
+        self.stop_indexing()
+        if self.json_data is None:
+            return
+        worker = IndexWorker(self.json_data, self.index_generation)
+        worker.built.connect(self.on_index_built)
+        worker.failed.connect(self.on_index_failed)
+        worker.finished.connect(lambda: self.index_workers.remove(worker))
+        self.index_worker = worker
+        self.index_workers.append(worker)
+        worker.start()
+
+    def stop_indexing(self):
+        """Drop the current index and any build in progress."""
+        self.index_timer.stop()
+        self.index_generation += 1
+        self.search_index = None
+        if self.index_worker is not None:
+            self.index_worker.cancel()
+            self.index_worker = None
+
+    def update_search_index(self, patch):
+        """Fold an edit into the search index, or schedule a rebuild if it cannot be folded in."""
+        if self.search_index is not None and self.index_worker is None:
+            parent = json_journal.resolve_path(self.json_data, patch["path"][:-1])
+            if self.search_index.apply_patch(patch, parent, patch.get("value")):
+                self.run_search()
+                return
+        # A build in progress may have walked the old value; start again once edits settle
+        self.stop_indexing()
+        if not self.index_on_demand or self.search_box.text():
+            self.index_timer.start()
+
+    def on_index_built(self, generation, index):
+        if generation != self.index_generation:
+            return
+        self.index_worker = None
+        self.index_failures = 0
+        self.search_index = index
+        self.run_search()
+
+    def on_index_failed(self, generation, error):
+        if generation != self.index_generation:
+            return
+        self.index_worker = None
+        self.search_results.clear()
+        self.search_results.addItem(f"Search unavailable: {error}")
+        # Usually the document changed under the walk; try again once edits settle
+        self.index_failures += 1
+        if self.index_failures <= INDEX_RETRY_LIMIT:
+            self.index_timer.start()
+
+    def run_search(self):
+        """Show the matches of the search box query, up to json_search.SEARCH_RESULT_LIMIT."""
+        query = self.search_box.text()
+        self.search_results.clear()
+        self.search_results.setVisible(bool(query))
+        if not query:
+            return
+        if self.search_index is None:
+            if self.index_worker is None and not self.index_timer.isActive() and self.loader is None \
+                    and self.index_failures <= INDEX_RETRY_LIMIT:
+                self.start_indexing()  # First search of a document indexed on demand
+            self.search_results.addItem("Indexing...")
+            return
+        if self.search_mode.currentText() == "Starts with":
+            matches = self.search_index.prefix(query)
+        else:
+            matches = self.search_index.substring(query)
+        if not matches:
+            self.search_results.addItem("No matches")
+        for path, term in matches:
+            text = " > ".join(str(key) for key in path) or "(root)"
+            entry = QListWidgetItem(f"{text}:  {term[:80]}")
+            entry.setData(Qt.UserRole, list(path))
+            self.search_results.addItem(entry)
+
+    def on_search_result_clicked(self, entry):
+        path = entry.data(Qt.UserRole)
+        if path is not None and not self.select_path(path):
+            QMessageBox.warning(self, "Warning", "That node no longer exists.")
+
+    def select_path(self, path):
+        """Expand the tree down to `path`, select the node and show its value. False if it does not exist."""
+        try:
+            index = self.model.index_for_path(path)
+        except (ValueError, IndexError, KeyError):
+            index = QModelIndex()
+        if not index.isValid():
+            return False
+        self.tree.scrollTo(index)
+        self.tree.setCurrentIndex(index)
+        self.on_item_clicked(index)
+        return True
 
     def convert_to_numeric(self, value):
         """Converts string values to integers or floats if possible"""
@@ -324,22 +690,32 @@ class JsonEditorApp(QWidget):
         except ValueError:
             return value
 
-    def auto_save_and_reload(self):
-        """Save the JSON file and reload the tree structure to reflect changes"""
-        with open(self.json_file_path, 'w') as json_file:
-            json.dump(self.json_data, json_file, indent=4)
-        self.load_json()
+    def on_save_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Failed to save JSON file: {error}")
+
+    def closeEvent(self, event):
+        # Do not lose edits still inside the debounce window
+        if self.save_engine is not None:
+            self.save_engine.flush()
+        for loader in list(self.loaders):
+            loader.cancel()
+            loader.wait()
+        self.stop_indexing()
+        for worker in list(self.index_workers):
+            worker.wait()
+        # A page may still be serializing (e.g. parsing a large unparsed entry); its text is dropped
+        self.preview_generation += 1
+        for worker in list(self.preview_workers):
+            worker.wait()
+        if isinstance(self.json_data, JsonlRecords):
+            self.json_data.close()
+        super().closeEvent(event)
 
     def save_entry(self):
-        if self.current_item is not None:
+        if self.current_item is not None and self.current_item.isValid():
             item_path = self.get_item_path(self.current_item)
             new_value = self.text_area.toPlainText().replace("\n", "\\n")
             self.set_json_value(item_path, new_value)
-
-            # Save updated JSON to file
-            with open(self.json_file_path, 'w') as json_file:
-                json.dump(self.json_data, json_file, indent=4)
-
             self.is_modified = False  # Reset the modification flag after saving
 
     def on_text_changed(self):
@@ -347,14 +723,14 @@ class JsonEditorApp(QWidget):
         self.is_modified = True
 
         # Disable save button if the selected item is not a leaf node
-        if self.current_item is None or self.current_item.childCount() > 0:
+        if self.current_item is None or not self.current_item.isValid() or self.model.hasChildren(QModelIndex(self.current_item)):
             self.save_button.setEnabled(False)
         else:
             self.save_button.setEnabled(True)
 
     def show_context_menu(self, position):
-        item = self.tree.itemAt(position)
-        if item:
+        item = self.tree.indexAt(position)
+        if item.isValid():
             menu = QMenu()
 
             delete_action = menu.addAction("Delete")
@@ -371,66 +747,49 @@ class JsonEditorApp(QWidget):
         # Get the item path
         item_path = self.get_item_path(item)
         if len(item_path) > 0:
-            # Remove from the JSON structure
-            parent = self.get_json_value(item_path[:-1])
-            key_to_remove = item_path[-1]
-            if isinstance(parent, list):
-                parent.pop(int(key_to_remove))
-            elif isinstance(parent, dict):
-                parent.pop(key_to_remove)
-
-            # Remove from the tree
-            parent_item = item.parent()
-            if parent_item:
-                parent_item.removeChild(item)
-            else:
-                index = self.tree.indexOfTopLevelItem(item)
-                self.tree.takeTopLevelItem(index)
-
-            # Save the updated JSON after deletion
-            with open(self.json_file_path, 'w') as json_file:
-                json.dump(self.json_data, json_file, indent=4)
+            # Remove from the JSON structure; the model drops the row if it was created
+            self.apply_edit({"op": "delete", "path": item_path})
 
     def add_item(self, item):
         # Get the item path
         item_path = self.get_item_path(item)
-        parent_item = item.parent()
         parent = self.get_json_value(item_path[:-1])  # Get parent of the selected node
+        copied_value = self.copy_json_value(self.get_json_value(item_path))
+        if self.coerce_numerics:
+            copied_value = self.convert_numerics(copied_value)
 
         # Check if it's a dictionary node or a list node
         if isinstance(parent, dict):
             # Generate a new key for the duplicated node
-            base_key = item.text(0)
-            new_key = base_key + "_copy"
-            parent[new_key] = self.copy_json_value(self.get_json_value(item_path))
-
-            # Add new tree item
-            new_item = QTreeWidgetItem([new_key])
-            parent_item.addChild(new_item)
-            self.load_json_into_tree(parent[new_key], new_item)
+            new_key = f"{item_path[-1]}_copy"
+            while new_key in parent:
+                new_key += "_copy"
+            self.apply_edit({"op": "insert", "path": item_path[:-1] + [new_key], "value": copied_value})
 
-        elif isinstance(parent, list):
-            # Get the index of the selected node
-            index = int(item.text(0))
-            parent.append(self.copy_json_value(parent[index]))
-
-            # Add new tree item
-            new_item = QTreeWidgetItem([str(len(parent) - 1)])
-            parent_item.addChild(new_item)
-            self.load_json_into_tree(parent[-1], new_item)
-
-        # Save the updated JSON after adding the duplicate entry
-        with open(self.json_file_path, 'w') as json_file:
-            json.dump(self.json_data, json_file, indent=4)
+        else:
+            # Append the copy at the end of the list (or of the JSONL file)
+            self.apply_edit({"op": "insert", "path": item_path[:-1] + [len(parent)], "value": copied_value})
 
     def copy_json_value(self, value):
-        """Recursively copy a JSON value (dicts, lists, or primitives)"""
-        if isinstance(value, dict):
-            return {k: self.copy_json_value(v) for k, v in value.items()}
-        elif isinstance(value, list):
-            return [self.copy_json_value(v) for v in value]
-        else:
+        """Copy a JSON value (dicts, lists, or primitives), iteratively to avoid the recursion limit"""
+        if not isinstance(value, (dict, list)):
             return value
+        copy = type(value)()
+        stack = [(value, copy)]
+        while stack:
+            source, target = stack.pop()
+            items = source.items() if isinstance(source, dict) else enumerate(source)
+            for key, child in items:
+                if isinstance(child, (dict, list)):
+                    child_copy = type(child)()
+                    stack.append((child, child_copy))
+                else:
+                    child_copy = child
+                if isinstance(target, dict):
+                    target[key] = child_copy
+                else:
+                    target.append(child_copy)
+        return copy
 
     def set_tree_font_size(self, size):
         """Set the font size for the tree view."""
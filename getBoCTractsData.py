@@ -2,6 +2,8 @@ import os
 import requests
 import pandas as pd
 import time
+from census_client import default_client, client_or_default, BASE_URL, VARIABLES_URL, MAX_WORKERS
+from census_types import save_results
 
 # Replace this with your actual Census API key
 CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
@@ -17,18 +19,23 @@ TRACTS = [
 VARIABLES = 'NAME,P1_001N,P2_002N,P2_005N'
 # See list of variables at:  https://api.census.gov/data/2020/dec/pl/variables.json
 
-BASE_URL = 'https://api.census.gov/data/2020/dec/pl'
+# Tracts listed explicitly in one request; counties with more are fetched whole ('tract:*') and filtered
+MAX_TRACTS_PER_REQUEST = 50
 """
 The dec/pl dataset refers to the Decennial Census Redistricting Data (Public Law 94-171). This dataset is produced every 10 years and contains population counts by race, Hispanic origin, and voting age for redistricting purposes. It is a complete enumeration rather than a sample and provides the most accurate population counts at the smallest geographic levels, such as blocks and tracts.
 """
 
-def fetch_tract_data(state, county, tract):
+def fetch_tract_data(state, county, tract, client=None):
     params = {
         'get': VARIABLES,
         'for': f'tract:{tract}',
         'in': f'state:{state} county:{county}',
         'key': CENSUS_API_KEY
     }
+    if client is not None:
+        # Shared session, rate limit and retries (see census_client.py)
+        data = client.get_json(BASE_URL, params)
+        return pd.DataFrame(data[1:], columns=data[0])
     response = requests.get(BASE_URL, params=params)
     if response.status_code != 200:
         raise Exception(f"Failed for tract {tract}: {response.text}")
@@ -49,10 +56,82 @@ def fetch_selected_tracts(tract_list):
     else:
         return pd.DataFrame()
 
-if __name__ == '__main__':
-    df = fetch_selected_tracts(TRACTS)
-    if not df.empty:
-        print(df.head())
-        df.to_csv('selected_census_tracts.csv', index=False)
+def plan_county_queries(tract_list, max_tracts=MAX_TRACTS_PER_REQUEST, use_wildcard=True):
+    """
+    Group tracts by (state, county) into as few queries as possible. Returns a list of
+    (state, county, tract_spec) where tract_spec is a comma-separated tract list or '*'.
+    A county with more than `max_tracts` tracts becomes one 'tract:*' query, or, if
+    `use_wildcard` is False, several queries of at most `max_tracts` tracts each.
+    """
+    counties = {}
+    for state, county, tract in tract_list:
+        tracts = counties.setdefault((state, county), [])
+        if tract not in tracts:
+            tracts.append(tract)
+    queries = []
+    for (state, county), tracts in counties.items():
+        if len(tracts) > max_tracts and use_wildcard:
+            queries.append((state, county, '*'))
+        else:
+            for chunk in range(0, len(tracts), max_tracts):
+                queries.append((state, county, ','.join(tracts[chunk:chunk + max_tracts])))
+    return queries
+
+def fetch_tracts_by_county(tract_list, max_workers=MAX_WORKERS, client=None):
+    """
+    Same output as fetch_selected_tracts, with one request per county (or per chunk of tracts)
+    instead of one per tract. Queries run concurrently; rows are filtered to the requested tracts
+    and returned in the order of `tract_list`.
+    """
+    with client_or_default(client, max_workers=max_workers) as client:
+        outcomes = client.map(lambda query: fetch_tract_data(*query, client=client), plan_county_queries(tract_list))
+    results = []
+    for (state, county, tracts), df, error in outcomes:
+        if error is not None:
+            print(f"Error retrieving tracts {tracts} in county {state}{county}: {error}")
+        else:
+            results.append(df)
+    if not results:
+        return pd.DataFrame()
+
+    # Keep only the requested tracts, in the requested order
+    df = pd.concat(results, ignore_index=True)
+    order = {}
+    for position, key in enumerate(tract_list):
+        order.setdefault(tuple(key), position)
+    positions = [order.get(key) for key in zip(df['state'], df['county'], df['tract'])]
+    df = df.assign(_order=positions).dropna(subset=['_order'])
+    df = df.drop_duplicates(subset=['state', 'county', 'tract']).sort_values('_order', kind='stable')
+    found = set(zip(df['state'], df['county'], df['tract']))
+    for state, county, tract in tract_list:
+        if (state, county, tract) not in found:
+            print(f"Error retrieving {tract}: not returned by the API")
+    return df.drop(columns='_order').reset_index(drop=True)
+
+def fetch_selected_tracts_concurrent(tract_list, max_workers=MAX_WORKERS, client=None):
+    """
+    Same output as fetch_selected_tracts, but up to `max_workers` tracts are requested at once over
+    a keep-alive session, paced by a token bucket instead of a fixed sleep and retried on 429/5xx.
+    """
+    with client_or_default(client, max_workers=max_workers) as client:
+        outcomes = client.map(lambda t: fetch_tract_data(*t, client=client), tract_list)
+    results = []
+    for (state, county, tract), df, error in outcomes:
+        if error is not None:
+            print(f"Error retrieving {tract}: {error}")
+        else:
+            results.append(df)
+    if results:
+        return pd.concat(results, ignore_index=True)
     else:
-        print("No data retrieved.")
+        return pd.DataFrame()
+
+if __name__ == '__main__':
+    with default_client() as client:
+        df = fetch_tracts_by_county(TRACTS, client=client)
+        if not df.empty:
+            print(df.head())
+            # Typed Parquet (see census_types.py); CSV if pyarrow is missing
+            save_results(df, client, VARIABLES_URL, 'selected_census_tracts')
+        else:
+            print("No data retrieved.")
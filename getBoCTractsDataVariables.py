@@ -1,27 +1,24 @@
 import os
-import requests
+import sys
 import pandas as pd
-import time
+from census_client import default_client, client_or_default, BASE_URL, VARIABLES_URL, MAX_WORKERS
+from census_types import save_results
 
 # Get API key at: https://api.census.gov/data/key_signup.html
 # then, add CENSUS_API_KEY to your environment variables
 CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
 
-# Set year and month (month is unused in this dataset, but reserved for generality)
-DATASET = '2020/dec/pl'
-BASE_URL = f'https://api.census.gov/data/{DATASET}'
-VARIABLES_URL = f'https://api.census.gov/data/{DATASET}/variables.json'
-
 # Define tract
 STATE = '48'       # Texas
 COUNTY = '029'     # Bexar
 TRACT = '110100'   # Example tract
 
-def get_all_variables():
-    response = requests.get(VARIABLES_URL)
-    if response.status_code != 200:
-        raise Exception(f"Could not fetch variables: {response.text}")
-    variables = response.json()['variables']
+# Columns that identify a row in every batch; batches are joined on them
+GEOGRAPHY_COLUMNS = ['state', 'county', 'tract']
+
+def get_all_variables(client):
+    # variables.json is large and rarely changes; it comes from the on-disk cache after the first run
+    variables = client.get_json(VARIABLES_URL)['variables']
     usable_vars = [var for var in variables if not var.startswith(('for', 'in'))]
     return usable_vars
 
@@ -29,7 +26,7 @@ def batch(lst, size):
     for i in range(0, len(lst), size):
         yield lst[i:i + size]
 
-def fetch_data_for_variable_batch(variable_batch, state, county, tract):
+def fetch_data_for_variable_batch(variable_batch, state, county, tract, client):
     var_string = ','.join(variable_batch)
     params = {
         'get': var_string,
@@ -37,32 +34,62 @@ def fetch_data_for_variable_batch(variable_batch, state, county, tract):
         'in': f'state:{state} county:{county}',
         'key': CENSUS_API_KEY
     }
-    response = requests.get(BASE_URL, params=params)
-    if response.status_code != 200:
-        raise Exception(f"Failed to retrieve batch: {response.text}")
-    data = response.json()
+    data = client.get_json(BASE_URL, params)
     return pd.DataFrame(data[1:], columns=data[0])
 
 def fetch_all_data_per_tract(state, county, tract):
-    variables = get_all_variables()
     all_results = []
-    for variable_batch in batch(variables, 45):  # Keep under 50 to include geography fields
-        try:
-            df = fetch_data_for_variable_batch(variable_batch, state, county, tract)
-            all_results.append(df)
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"Batch error: {e}")
+    # The client paces requests itself, so there is no sleep between batches
+    with default_client() as client:
+        variables = get_all_variables(client)
+        for variable_batch in batch(variables, 45):  # Keep under 50 to include geography fields
+            try:
+                df = fetch_data_for_variable_batch(variable_batch, state, county, tract, client)
+                all_results.append(df)
+            except Exception as e:
+                print(f"Batch error: {e}")
     if not all_results:
         return pd.DataFrame()
-    merged = pd.concat(all_results, axis=1)
+    return join_on_geography(all_results)
+
+def join_on_geography(frames):
+    """Join variable batches on the geography columns (not by row position), geography last."""
+    merged = pd.concat([df.set_index(GEOGRAPHY_COLUMNS) for df in frames], axis=1, join='outer')
     merged = merged.loc[:, ~merged.columns.duplicated()]
-    return merged
+    return merged.reset_index().loc[:, list(merged.columns) + GEOGRAPHY_COLUMNS]
+
+def fetch_all_data_for_area(state, county='*', max_workers=MAX_WORKERS, client=None):
+    """
+    Every variable for every tract of a county, or of the whole state with county='*'. The
+    variable list is loaded once and each batch is one 'tract:*' request, run concurrently, so
+    the cost is one call per batch instead of one per batch and tract.
+    """
+    with client_or_default(client, max_workers=max_workers) as client:
+        variables = get_all_variables(client)
+        outcomes = client.map(lambda variable_batch: fetch_data_for_variable_batch(variable_batch, state, county, '*', client),
+                              list(batch(variables, 45)))
+    all_results = []
+    for variable_batch, df, error in outcomes:
+        if error is not None:
+            print(f"Batch error ({variable_batch[0]}...): {error}")
+        else:
+            all_results.append(df)
+    if not all_results:
+        return pd.DataFrame()
+    return join_on_geography(all_results)
 
 if __name__ == '__main__':
-    df = fetch_all_data_per_tract(STATE, COUNTY, TRACT)
+    # "--sweep" fetches every tract of the county instead of the single example tract
+    if '--sweep' in sys.argv:
+        df = fetch_all_data_for_area(STATE, COUNTY)
+        output_name = f'census_county_{STATE}{COUNTY}_all_variables'
+    else:
+        df = fetch_all_data_per_tract(STATE, COUNTY, TRACT)
+        output_name = f'census_tract_{TRACT}_all_variables'
     if not df.empty:
         print(df.head())
-        df.to_csv(f'census_tract_{TRACT}_all_variables.csv', index=False)
+        # Wide all-variable tables shrink the most as typed, compressed Parquet
+        with default_client() as client:
+            save_results(df, client, VARIABLES_URL, output_name)
     else:
         print("No data retrieved.")
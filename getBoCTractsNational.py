@@ -0,0 +1,132 @@
+import time
+import json
+import sqlite3
+import threading
+import pandas as pd
+from census_client import default_client, MAX_WORKERS
+from census_types import save_results
+from getBoCTractsPerCounty import BASE_URL, VARIABLES_URL, CENSUS_API_KEY, fetch_census_tract_data
+
+"""
+Resumable nationwide harvest of tract data, one county at a time.
+
+Every state and county is listed with a single API call and recorded as a unit in a local SQLite
+progress database. Units are fetched concurrently through census_client.CensusClient (rate limited,
+retried, cached), and each finished unit is committed together with its rows, so a crashed or
+interrupted run picks up where it stopped. A rerun only fetches units that failed, were never
+fetched, or are older than STALE_SECONDS. The variables fetched are those of getBoCTractsPerCounty.
+"""
+
+PROGRESS_DB = 'tract_harvest.sqlite'
+STALE_SECONDS = 30 * 24 * 3600
+REPORT_EVERY = 100  # Print a progress line every this many finished units
+
+class HarvestProgress:
+    def __init__(self, path=PROGRESS_DB):
+        self.lock = threading.Lock()  # The fetch threads share one connection
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            "state TEXT, county TEXT, name TEXT, status TEXT DEFAULT 'pending', fetched_at REAL, "
+            "attempts INTEGER DEFAULT 0, error TEXT, rows TEXT, PRIMARY KEY (state, county))"
+        )
+        self.connection.commit()
+
+    def add_units(self, units):
+        """Record [(state, county, name), ...]; units already known keep their status."""
+        with self.lock:
+            self.connection.executemany("INSERT OR IGNORE INTO units (state, county, name) VALUES (?, ?, ?)", units)
+            self.connection.commit()
+
+    def due_units(self, stale_seconds=STALE_SECONDS):
+        """Units that are pending, failed, or were fetched longer than `stale_seconds` ago."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT state, county FROM units WHERE status != 'done' OR fetched_at < ? ORDER BY state, county",
+                (time.time() - stale_seconds,),
+            ).fetchall()
+
+    def mark_done(self, state, county, data):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE units SET status = 'done', fetched_at = ?, attempts = attempts + 1, error = NULL, rows = ? "
+                "WHERE state = ? AND county = ?",
+                (time.time(), json.dumps(data), state, county),
+            )
+            self.connection.commit()
+
+    def mark_failed(self, state, county, error):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE units SET status = 'failed', attempts = attempts + 1, error = ? WHERE state = ? AND county = ?",
+                (str(error), state, county),
+            )
+            self.connection.commit()
+
+    def summary(self):
+        """{status: number of units}"""
+        with self.lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM units GROUP BY status").fetchall())
+
+    def results_frame(self):
+        """All harvested rows as one DataFrame (string columns, like the API returns them)."""
+        with self.lock:
+            cursor = self.connection.execute("SELECT rows FROM units WHERE status = 'done' ORDER BY state, county")
+            frames = []
+            for (rows,) in cursor:
+                data = json.loads(rows)
+                frames.append(pd.DataFrame(data[1:], columns=data[0]))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def close(self):
+        self.connection.close()
+
+def list_counties(client):
+    """[(state, county, name), ...] for every county in the dataset, from one request."""
+    data = client.get_json(BASE_URL, {'get': 'NAME', 'for': 'county:*', 'key': CENSUS_API_KEY})
+    header = data[0]
+    name, state, county = header.index('NAME'), header.index('state'), header.index('county')
+    return [(row[state], row[county], row[name]) for row in data[1:]]
+
+def harvest(progress, client, stale_seconds=STALE_SECONDS):
+    """Fetch every due unit concurrently, checkpointing each one as it finishes. Returns the summary."""
+    progress.add_units(list_counties(client))
+    due = progress.due_units(stale_seconds)
+    print(f"{len(due)} counties to fetch")
+    finished = [0]
+    counter_lock = threading.Lock()
+
+    def fetch_unit(unit):
+        state, county = unit
+        try:
+            df = fetch_census_tract_data(client, state, county)
+            progress.mark_done(state, county, [list(df.columns)] + df.values.tolist())
+        except Exception as e:
+            progress.mark_failed(state, county, e)
+            raise
+        finally:
+            with counter_lock:
+                finished[0] += 1
+                if finished[0] % REPORT_EVERY == 0:
+                    print(f"{finished[0]}/{len(due)} counties done")
+
+    for (state, county), _, error in client.map(fetch_unit, due):
+        if error is not None:
+            print(f"Error retrieving county {state}{county}: {error}")
+    return progress.summary()
+
+if __name__ == '__main__':
+    progress = HarvestProgress()
+    try:
+        with default_client(max_workers=MAX_WORKERS) as client:
+            print(harvest(progress, client))
+            df = progress.results_frame()
+            if not df.empty:
+                print(f"{len(df)} tracts harvested")
+                save_results(df, client, VARIABLES_URL, 'national_tract_data')
+            else:
+                print("No data retrieved.")
+    finally:
+        progress.close()
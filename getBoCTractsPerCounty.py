@@ -1,25 +1,34 @@
 import os
-import requests
 import pandas as pd
+from census_client import default_client, BASE_URL, VARIABLES_URL
+from census_types import save_results
 
 # Replace this with your actual Census API key
 CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
 
 # Example parameters: 2020 Decennial Census (PL 94-171), Texas (state=48), Bexar County (county=029)
-BASE_URL = 'https://api.census.gov/data/2020/dec/pl'
-PARAMS = {
-    'get': 'NAME,P1_001N',  # Total population
-    'for': 'tract:*',
-    'in': 'state:48 county:029',
-    'key': CENSUS_API_KEY
-}
+STATE = '48'
+COUNTY = '029'
+VARIABLES = 'NAME,P1_001N'  # Total population
 
-def fetch_census_tract_data():
-    response = requests.get(BASE_URL, params=PARAMS)
-    if response.status_code != 200:
-        raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
-    
-    data = response.json()
+def county_params(state, county):
+    return {
+        'get': VARIABLES,
+        'for': 'tract:*',
+        'in': f'state:{state} county:{county}',
+        'key': CENSUS_API_KEY
+    }
+
+PARAMS = county_params(STATE, COUNTY)
+
+def fetch_census_tract_data(client=None, state=STATE, county=COUNTY):
+    params = county_params(state, county)
+    # Repeat runs are answered from the on-disk cache (see census_cache.py)
+    if client is None:
+        with default_client() as client:
+            data = client.get_json(BASE_URL, params)
+    else:
+        data = client.get_json(BASE_URL, params)
     headers = data[0]
     records = data[1:]
     
@@ -28,8 +37,10 @@ def fetch_census_tract_data():
 
 if __name__ == '__main__':
     try:
-        df = fetch_census_tract_data()
-        print(df.head())
-        df.to_csv('census_tract_data.csv', index=False)
+        with default_client() as client:
+            df = fetch_census_tract_data(client)
+            print(df.head())
+            # Typed Parquet (see census_types.py); CSV if pyarrow is missing
+            save_results(df, client, VARIABLES_URL, 'census_tract_data')
     except Exception as e:
         print(f"Error fetching data: {e}")
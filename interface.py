@@ -2,11 +2,12 @@ from PyQt5.QtWidgets import (QApplication, QWidget, QTextEdit, QLineEdit, QVBoxL
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, QMessageBox, QComboBox)
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtGui import QFont, QWheelEvent
+from config_store import ConfigStore
 
 class CHIMPInterface(QWidget):
     approved_signal = pyqtSignal(str)
 
-    def __init__(self, agent, initial_request, initial_instructions, json_file_path):
+    def __init__(self, agent, initial_request, initial_instructions, json_file_path, task_id=None):
         super().__init__()
         self.agent = agent
         self.latest_response = ""
@@ -15,7 +16,11 @@ class CHIMPInterface(QWidget):
         self.current_font_size = 16  # Initial font size
         
         self.json_file_path = json_file_path
-        self.json_data = self.load_json()
+        self.config_store = self.load_config_store()
+        # Tasks are tracked by id so edits survive changes to the request text
+        self.task_id = task_id
+        if self.task_id is None and self.config_store is not None:
+            self.task_id = self.config_store.find_task_id(initial_request)
         self.setWindowTitle(f"Chat with {self.agent.agent_name}")
         self.setGeometry(100, 100, 600, 400)
         
@@ -24,20 +29,12 @@ class CHIMPInterface(QWidget):
         # Install event filter
         self.text_area.installEventFilter(self)
 
-    def load_json(self):
+    def load_config_store(self):
         try:
-            with open(self.json_file_path, 'r') as file:
-                return json.load(file)
+            return ConfigStore.open(self.json_file_path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load JSON file: {e}")
-            return {}
-
-    def save_json(self):
-        try:
-            with open(self.json_file_path, 'w') as file:
-                json.dump(self.json_data, file, indent=4)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save JSON file: {e}")
+            return None
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -164,11 +161,11 @@ class CHIMPInterface(QWidget):
             except Exception as e:
                 QMessageBox.critical(self, 'Error', f'Could not save file: {e}')
     
-    def get_current_task_index(self):
-        for i in range(len(self.json_data['TASKS'])):
-            if self.json_data['TASKS'][i]['request'] == self.initial_request:
-                return i
-        return -1
+    def get_current_task(self):
+        if self.config_store is None or self.task_id is None:
+            return None
+        self.config_store.refresh()
+        return self.config_store.get_task(self.task_id)
 
     def on_add_to_json_clicked(self):
         selected_value = self.dropdown_box.currentText()
@@ -176,23 +173,20 @@ class CHIMPInterface(QWidget):
             QMessageBox.warning(self, "Warning", "No value selected from the dropdown.")
             return
 
-        task_updated = False
-        for task in self.json_data["TASKS"]:
-            if task['request'] == self.initial_request:
-                task['request'] = f"{self.initial_request} \n\n{selected_value}"
-                task_updated = True
-                break
-
-        if task_updated:
-            self.save_json()
-            self.json_data = self.load_json()
-            self.text_area.append("Task updated and saved to JSON.")
-            self.update_ui_after_json_save()
-        else:
+        task = self.get_current_task()
+        if task is None:
             QMessageBox.warning(self, "Warning", "Failed to update the task in JSON.")
+            return
+
+        try:
+            self.config_store.update_task(self.task_id, request=f"{task['request']} \n\n{selected_value}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to save JSON file: {e}")
+            return
+        self.text_area.append("Task updated and saved to JSON.")
+        self.update_ui_after_json_save()
 
     def update_ui_after_json_save(self):
-        current_task_index = self.get_current_task_index()
-        if current_task_index != -1:
-            updated_task = self.json_data["TASKS"][current_task_index]
+        updated_task = self.get_current_task()
+        if updated_task is not None:
             self.text_area.append(f"Updated Task: {updated_task['request']}")
@@ -0,0 +1,175 @@
+import os
+import json
+import tempfile
+from abc import ABC, abstractmethod
+
+"""
+This file holds the helpers used to change JSON files safely. Edits are expressed as small path-based
+patches so they can be written to an append-only journal before they touch the document, and the
+document itself is always replaced atomically (write to a temp file, then rename).
+
+A patch is a plain dict:
+
+1. {"op": "set",    "path": [...], "value": v}
+2. {"op": "delete", "path": [...]}
+3. {"op": "insert", "path": [...], "value": v, "index": i}   (index is optional, dicts only)
+
+The path is the list of keys/indexes from the document root to the node being changed.
+
+Documents may hold LazyValue placeholders for parts that have not been parsed yet (see
+json_loader.py); walking a path through one parses it and stores the result in its place. Besides
+dicts and lists, the root may be a list-like sequence such as jsonl_document.JsonlRecords.
+"""
+
+class LazyValue(ABC):
+    """Placeholder for a JSON value that has not been parsed yet; load() parses and returns it."""
+    is_container = False  # True if the value is an object or array
+    has_children = False  # True if it is a non-empty object or array
+
+    @abstractmethod
+    def load(self):
+        """Parse and return the value."""
+
+def materialize(container, key):
+    """container[key], parsing it in place first if it is still a LazyValue."""
+    value = container[key]
+    if isinstance(value, LazyValue):
+        value = container[key] = value.load()
+    return value
+
+def encode_lazy(obj):
+    """`default=` hook for json.dump(s): serialize unparsed values by parsing them on the fly."""
+    if isinstance(obj, LazyValue):
+        return obj.load()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def atomic_write_json(path, data, indent=4, default=None):
+    """Write `data` to a temp file next to `path`, fsync it and rename it over `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(data, file, indent=indent, default=default)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def container_key(container, key):
+    """List indexes travel as strings in tree paths; convert them back when needed."""
+    if isinstance(container, dict):
+        return key
+    return int(key)
+
+def resolve_path(data, path):
+    obj = data
+    for key in path:
+        obj = materialize(obj, container_key(obj, key))
+    return obj
+
+def insert_dict_key(container, key, value, index=None):
+    """Insert `key` at position `index` while keeping the identity of `container`."""
+    if index is None or index >= len(container):
+        container[key] = value
+        return
+    items = list(container.items())
+    items.insert(index, (key, value))
+    container.clear()
+    container.update(items)
+
+def apply_patch(data, patch):
+    """Apply `patch` to `data` in place and return the patch that undoes it."""
+    op = patch["op"]
+    path = list(patch["path"])
+    parent = resolve_path(data, path[:-1])
+    key = container_key(parent, path[-1])
+
+    # Sequence-like roots (jsonl_document.JsonlRecords) are told which path changed
+    patched = getattr(data, "patched", None)
+    if patched is not None:
+        patched(path)
+
+    if op == "set":
+        if not isinstance(parent, dict) or key in parent:
+            old_value = parent[key]
+            parent[key] = patch["value"]
+            return {"op": "set", "path": path, "value": old_value}
+        parent[key] = patch["value"]
+        return {"op": "delete", "path": path}
+
+    if op == "delete":
+        if not isinstance(parent, dict):
+            return {"op": "insert", "path": path, "value": parent.pop(key)}
+        index = list(parent).index(key)
+        return {"op": "insert", "path": path, "value": parent.pop(key), "index": index}
+
+    if op == "insert":
+        if not isinstance(parent, dict):
+            parent.insert(key, patch["value"])
+        else:
+            insert_dict_key(parent, key, patch["value"], patch.get("index"))
+        return {"op": "delete", "path": path}
+
+    raise ValueError(f"Unknown patch operation: {op}")
+
+def file_stamp(path):
+    """Cheap change marker for a file: (mtime in ns, size), or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+class PatchJournal:
+    """
+    Append-only log of patches for one JSON file. Each line is one patch; the journal is cleared
+    once the patched document has been written, so anything left in it after a crash is replayed.
+    The first line records the stamp of the document the patches apply to, so a journal that
+    outlived its snapshot (crash between rename and clear) is recognised as stale.
+    """
+
+    def __init__(self, path, document_path):
+        self.path = path
+        self.document_path = document_path
+
+    def append(self, patches):
+        with open(self.path, 'a') as file:
+            if file.tell() == 0:
+                file.write(json.dumps({"base": file_stamp(self.document_path)}) + "\n")
+            for patch in patches:
+                file.write(json.dumps(patch, default=encode_lazy) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def pending(self):
+        """Return the patches recorded since the last clear. A torn last line is ignored."""
+        if not os.path.exists(self.path):
+            return []
+        patches = []
+        with open(self.path, 'r') as file:
+            try:
+                header = json.loads(file.readline())
+            except json.JSONDecodeError:
+                return []
+            if header.get("base") != file_stamp(self.document_path):
+                return []
+            for line in file:
+                try:
+                    patches.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return patches
+
+    def replay(self, data):
+        """Apply pending patches to `data` and return how many were applied."""
+        patches = self.pending()
+        for patch in patches:
+            apply_patch(data, patch)
+        return len(patches)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
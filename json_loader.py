@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import mmap
+import tempfile
+from PyQt5.QtCore import QThread, pyqtSignal
+from json_journal import LazyValue, encode_lazy
+from jsonl_document import JsonlRecords
+
+"""
+Background loading of JSON files for editJSON.py.
+
+Files below LARGE_FILE_BYTES are read in chunks (for progress and cancellation) and parsed with
+json.loads on a worker thread. Larger files are not parsed up front: the loader scans them for the
+byte range of every top-level entry, in the spirit of ijson's event stream, and hands the editor
+LazyJsonValue placeholders in batches as it goes, so the tree opens before the whole file is read.
+An entry is parsed only when it is expanded, selected or edited. JSON Lines files (.jsonl) are only
+indexed by line (see jsonl_document.py), whatever their size.
+"""
+
+LARGE_FILE_BYTES = 32 * 1024 * 1024
+READ_CHUNK_BYTES = 4 * 1024 * 1024
+ENTRY_BATCH_SIZE = 1000
+
+# Strings and brackets are the only tokens needed to find where a nested value ends;
+# group 1 matches an opening bracket, group 2 a closing one
+TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|([{\[])|([}\]])', re.DOTALL)
+STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+SCALAR = re.compile(rb'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+WHITESPACE = re.compile(rb'\s*')
+SEPARATOR = re.compile(rb'\s*,?\s*')
+KEY = re.compile(rb'("[^"\\]*(?:\\.[^"\\]*)*")\s*:\s*', re.DOTALL)
+
+class LoadCancelled(Exception):
+    pass
+
+class LazyJsonValue(LazyValue):
+    """A top-level entry of a large file, known only by its byte range."""
+    __slots__ = ("file_path", "start", "end", "is_container", "has_children")
+
+    def __init__(self, file_path, start, end, first_byte, empty):
+        self.file_path = file_path
+        self.start = start
+        self.end = end
+        self.is_container = first_byte in b"{["
+        self.has_children = self.is_container and not empty
+
+    def read_bytes(self):
+        with open(self.file_path, 'rb') as file:
+            file.seek(self.start)
+            return file.read(self.end - self.start)
+
+    def load(self):
+        return json.loads(self.read_bytes())
+
+def scan_top_level(mm, file_path, on_entries, is_cancelled, on_progress):
+    """
+    Walk the top level of the document in `mm`, calling on_entries([(key, LazyJsonValue), ...])
+    in batches. Object entries are keyed by name, array entries by index.
+    """
+    size = len(mm)
+    pos = WHITESPACE.match(mm, 0).end()
+    root_byte = mm[pos:pos + 1]
+    if root_byte not in (b"{", b"["):
+        raise ValueError("Lazy loading needs an object or array at the top level")
+    is_object = root_byte == b"{"
+    close_byte = b"}" if is_object else b"]"
+    pos += 1
+    batch = []
+    index = 0
+
+    while True:
+        pos = SEPARATOR.match(mm, pos).end()
+        if pos >= size:
+            raise ValueError("Unexpected end of file")
+        if mm[pos:pos + 1] == close_byte:
+            break
+        if is_object:
+            match = KEY.match(mm, pos)
+            if match is None:
+                raise ValueError(f"Expected a key at byte {pos}")
+            raw_key = match.group(1)
+            key = json.loads(raw_key) if b"\\" in raw_key else raw_key[1:-1].decode("utf-8")
+            pos = match.end()
+        else:
+            key = index
+        index += 1
+
+        start = pos
+        first_byte = mm[start:start + 1]
+        if first_byte in (b"{", b"["):
+            end = find_container_end(mm, start, is_cancelled)
+            empty = WHITESPACE.match(mm, start + 1).end() == end - 1
+        else:
+            match = (STRING if first_byte == b'"' else SCALAR).match(mm, start)
+            if match is None:
+                raise ValueError(f"Unexpected value at byte {start}")
+            end = match.end()
+            empty = True
+        batch.append((key, LazyJsonValue(file_path, start, end, first_byte, empty)))
+        pos = end
+
+        if len(batch) >= ENTRY_BATCH_SIZE:
+            if is_cancelled():
+                raise LoadCancelled()
+            on_entries(batch)
+            on_progress(int(100 * pos / size))
+            batch = []
+
+    if batch:
+        on_entries(batch)
+    on_progress(100)
+
+def find_container_end(mm, start, is_cancelled):
+    """Byte offset just past the object/array that starts at `start`."""
+    depth = 0
+    for count, match in enumerate(TOKEN.finditer(mm, start)):
+        bracket = match.lastindex
+        if bracket == 1:
+            depth += 1
+        elif bracket == 2:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+        if count % 100000 == 0 and is_cancelled():
+            raise LoadCancelled()
+    raise ValueError(f"Unterminated value starting at byte {start}")
+
+def atomic_write_lazy_json(path, data):
+    """
+    Write a document whose top-level entries may still be LazyJsonValues. Unparsed entries are
+    copied byte for byte from the current file (no parsing) and re-pointed at their new ranges,
+    then the file is replaced atomically like json_journal.atomic_write_json.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    relocations = []
+    try:
+        with os.fdopen(fd, 'wb') as out, open(path, 'rb') as source:
+            is_object = isinstance(data, dict)
+            out.write(b"{" if is_object else b"[")
+            items = data.items() if is_object else enumerate(data)
+            for i, (key, value) in enumerate(items):
+                out.write(b",\n    " if i else b"\n    ")
+                if is_object:
+                    out.write(json.dumps(key).encode() + b": ")
+                if isinstance(value, LazyJsonValue) and os.path.abspath(value.file_path) == os.path.abspath(path):
+                    source.seek(value.start)
+                    start = out.tell()
+                    out.write(source.read(value.end - value.start))
+                    relocations.append((value, start, out.tell()))
+                else:
+                    text = json.dumps(value, indent=4, default=encode_lazy)
+                    out.write(text.replace("\n", "\n    ").encode())
+            out.write(b"\n}" if is_object else b"\n]")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    for value, start, end in relocations:
+        value.start = start
+        value.end = end
+
+class JsonLoader(QThread):
+    progress = pyqtSignal(int)            # percent of the file read or scanned
+    lazy_root = pyqtSignal(object)        # large files: empty dict/list that entries will be added to
+    entries_found = pyqtSignal(list)      # large files: [(key, LazyJsonValue), ...]
+    loaded = pyqtSignal(object, bool)     # document, whether it holds lazy entries or is a JsonlRecords
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, file_path, large_file_bytes=LARGE_FILE_BYTES):
+        super().__init__()
+        self.file_path = file_path
+        self.large_file_bytes = large_file_bytes
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def is_cancelled(self):
+        return self.cancel_requested
+
+    def run(self):
+        try:
+            if self.file_path.lower().endswith(".jsonl"):
+                self.load_jsonl()
+            elif os.path.getsize(self.file_path) >= self.large_file_bytes:
+                self.load_lazy()
+            else:
+                self.load_full()
+        except LoadCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def load_full(self):
+        size = max(os.path.getsize(self.file_path), 1)
+        chunks = []
+        read = 0
+        with open(self.file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(READ_CHUNK_BYTES), b""):
+                if self.cancel_requested:
+                    raise LoadCancelled()
+                chunks.append(chunk)
+                read += len(chunk)
+                self.progress.emit(int(100 * read / size))
+        data = json.loads(b"".join(chunks))
+        if self.cancel_requested:
+            raise LoadCancelled()
+        self.loaded.emit(data, False)
+
+    def load_lazy(self):
+        with open(self.file_path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = WHITESPACE.match(mm, 0).end()
+                root = {} if mm[start:start + 1] == b"{" else []
+                self.lazy_root.emit(root)
+                scan_top_level(mm, self.file_path, self.entries_found.emit, self.is_cancelled, self.progress.emit)
+        self.loaded.emit(root, True)
+
+    def load_jsonl(self):
+        records = JsonlRecords(self.file_path)
+        if not records.open(self.progress.emit, self.is_cancelled):
+            records.close()
+            raise LoadCancelled()
+        self.progress.emit(100)
+        self.loaded.emit(records, True)
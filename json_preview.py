@@ -0,0 +1,56 @@
+import json
+from PyQt5.QtCore import QThread, pyqtSignal
+from json_journal import encode_lazy
+
+"""
+Bounded, paginated preview of a JSON subtree for editJSON.py.
+
+Instead of json.dumps() over the whole subtree, JsonPreview keeps a JSONEncoder.iterencode()
+generator and pulls only enough chunks to fill one page. "Load more" resumes the same generator,
+so the cost of a preview is proportional to what has been shown, not to the size of the subtree.
+PreviewWorker produces pages on a background thread.
+"""
+
+PREVIEW_PAGE_CHARS = 64 * 1024
+
+class JsonPreview:
+    def __init__(self, value, default=encode_lazy):
+        self.chunks = json.JSONEncoder(indent=4, default=default).iterencode(value)
+        self.finished = False
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Page through an iterator of ready-made text instead of serializing a value."""
+        preview = cls(None)
+        preview.chunks = iter(chunks)
+        return preview
+
+    def next_page(self, max_chars=PREVIEW_PAGE_CHARS):
+        """Serialize roughly `max_chars` more characters. Sets `finished` when the subtree is done."""
+        parts = []
+        size = 0
+        try:
+            while size < max_chars:
+                chunk = next(self.chunks)
+                parts.append(chunk)
+                size += len(chunk)
+        except StopIteration:
+            self.finished = True
+        except (RuntimeError, ValueError, LookupError) as e:
+            # The subtree was edited (or its file saved) while it was being serialized
+            self.finished = True
+            parts.append(f"\n\n[Preview stopped: {e}]")
+        return "".join(parts)
+
+class PreviewWorker(QThread):
+    page_ready = pyqtSignal(int, str, bool)  # preview generation, text, finished
+
+    def __init__(self, preview, generation, max_chars=PREVIEW_PAGE_CHARS):
+        super().__init__()
+        self.preview = preview
+        self.generation = generation
+        self.max_chars = max_chars
+
+    def run(self):
+        text = self.preview.next_page(self.max_chars)
+        self.page_ready.emit(self.generation, text, self.preview.finished)
@@ -0,0 +1,61 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from json_journal import PatchJournal, atomic_write_json
+
+"""
+Debounced, crash-safe saving for editJSON.py.
+
+Every edit is appended to "<file>.edit-journal" as soon as it is made (see json_journal.py); the full
+document is only written once edits stop arriving for SAVE_DEBOUNCE_MS, and then atomically through
+a temp file and rename. If the editor dies before that, the journal is replayed on the next load.
+"""
+
+SAVE_DEBOUNCE_MS = 500
+JOURNAL_SUFFIX = ".edit-journal"  # Distinct from config_store's, so the two never replay each other's edits
+
+class SaveEngine(QObject):
+    saved = pyqtSignal()
+    save_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, get_data, parent=None, writer=atomic_write_json):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.get_data = get_data  # Returns the document to write
+        self.writer = writer  # writer(path, data) must replace the file atomically, or patch it in place (JSONL)
+        self.journal = PatchJournal(f"{file_path}{JOURNAL_SUFFIX}", file_path)
+        self.dirty = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SAVE_DEBOUNCE_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def record(self, patches):
+        """Journal `patches` (already applied in memory) and (re)start the debounce window."""
+        # JSONL records can sit at a different line of the file than their index in the editor
+        journal_patch = getattr(self.get_data(), "journal_patch", None)
+        if journal_patch is not None:
+            patches = [journal_patch(patch) for patch in patches]
+        self.journal.append(patches)
+        self.dirty = True
+        self.timer.start()
+
+    def recover(self, data):
+        """Replay edits a previous session journaled but never saved. Returns how many were replayed."""
+        replayed = self.journal.replay(data)
+        if replayed:
+            self.dirty = True
+            self.timer.start()
+        return replayed
+
+    def flush(self):
+        """Write the document now if there are unsaved edits."""
+        self.timer.stop()
+        if not self.dirty:
+            return
+        try:
+            self.writer(self.file_path, self.get_data())
+            self.journal.clear()
+            self.dirty = False
+            self.saved.emit()
+        except Exception as e:
+            self.save_failed.emit(str(e))
@@ -0,0 +1,162 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from PyQt5.QtCore import QThread, pyqtSignal
+from json_journal import LazyValue
+
+"""
+Key/value search for editJSON.py.
+
+SearchIndex is an inverted index of every object key and string value in a document, each with the
+path of the node it belongs to. Terms are kept lower-cased and sorted, so a prefix query is two
+bisects, and also joined into one string so a substring query is a series of str.find() calls in C
+instead of a Python loop over hundreds of thousands of nodes.
+
+The index is built on a worker thread (IndexWorker). Edits are folded in as they happen: the
+subtree an edit replaces is masked out and the terms of its new value go to a small overlay that
+is scanned linearly. Inserting or deleting list items renumbers their siblings, so those edits (or
+an overlay that has grown too large) ask for a rebuild instead.
+"""
+
+SEARCH_RESULT_LIMIT = 200
+OVERLAY_LIMIT = 10000
+SEPARATOR = "\0"
+
+def child_items(path, value):
+    """(path, child, key) for each child of a container, produced one at a time; key is None for list items."""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield path + (key,), child, key
+    elif isinstance(value, list):
+        for i, child in enumerate(value):
+            yield path + (i,), child, None
+    elif value is not None and hasattr(value, "peek"):
+        # jsonl_document.JsonlRecords: parse records as they are reached, without disturbing its cache
+        for i in range(len(value)):
+            yield path + (i,), value.peek(i), None
+
+def index_entries(data, is_cancelled=None):
+    """
+    [(term, path), ...] for all keys and string values in `data`. The walk is depth first over
+    child iterators, so unparsed values and JSONL records are parsed one at a time and dropped once
+    their terms are collected.
+    """
+    entries = []
+    stack = [iter([((), data, None)])]
+    count = 0
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        path, value, key = item
+        if key is not None:
+            entries.append((key, path))
+        if isinstance(value, LazyValue):
+            value = value.load()
+        if isinstance(value, str):
+            entries.append((value, path))
+        else:
+            stack.append(child_items(path, value))
+        count += 1
+        if is_cancelled is not None and count % 10000 == 0 and is_cancelled():
+            return None
+    return entries
+
+class SearchIndex:
+    def __init__(self, entries):
+        # Sort on the term only: paths mix str keys and int indexes and cannot be compared
+        entries = sorted(((text.lower(), path) for text, path in entries if text), key=lambda entry: entry[0])
+        self.terms = [term for term, _ in entries]
+        self.paths = [path for _, path in entries]
+        self.blob = SEPARATOR.join(self.terms)
+        self.offsets = array('q')  # start of each term in blob
+        pos = 0
+        for term in self.terms:
+            self.offsets.append(pos)
+            pos += len(term) + 1
+        self.masked = set()  # paths whose subtree changed since the build
+        self.overlay = []    # (term, path) added since the build
+
+    def _live(self, path):
+        return not any(path[:n] in self.masked for n in range(len(path) + 1))
+
+    def _results(self, matches, overlay_match, limit):
+        results = []
+        seen = set()
+        for i in matches:
+            path = self.paths[i]
+            if path not in seen and self._live(path):
+                seen.add(path)
+                results.append((path, self.terms[i]))
+                if len(results) >= limit:
+                    return results
+        for term, path in self.overlay:
+            if path not in seen and overlay_match(term):
+                seen.add(path)
+                results.append((path, term))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def prefix(self, query, limit=SEARCH_RESULT_LIMIT):
+        """[(path, term), ...] for terms starting with `query` (case-insensitive)."""
+        query = query.lower()
+        start = bisect_left(self.terms, query)
+        end = bisect_right(self.terms, query + "\U0010ffff", start)
+        return self._results(range(start, end), lambda term: term.startswith(query), limit)
+
+    def substring(self, query, limit=SEARCH_RESULT_LIMIT):
+        """[(path, term), ...] for terms containing `query` (case-insensitive)."""
+        query = query.lower().replace(SEPARATOR, "")
+        if not query:
+            return []
+        return self._results(self._find_all(query), lambda term: query in term, limit)
+
+    def _find_all(self, query):
+        pos = self.blob.find(query)
+        while pos != -1:
+            i = bisect_right(self.offsets, pos) - 1
+            yield i
+            # Continue with the next term; one match per term is enough
+            next_start = self.offsets[i] + len(self.terms[i]) + 1
+            pos = self.blob.find(query, next_start)
+
+    def apply_patch(self, patch, parent, value=None):
+        """
+        Fold an edit into the index. `parent` is the container the patch changed and `value` the new
+        value for set/insert. Returns False if the edit renumbers list items and needs a rebuild.
+        """
+        path = tuple(patch["path"])
+        if not isinstance(parent, dict) and patch["op"] != "set":
+            return False
+        self.masked.add(path)
+        self.overlay = [(term, p) for term, p in self.overlay if p[:len(path)] != path]
+        if patch["op"] != "delete":
+            if isinstance(parent, dict):
+                self.overlay.append((str(path[-1]).lower(), path))
+            for text, sub_path in index_entries(value):
+                if text:
+                    self.overlay.append((text.lower(), path + sub_path))
+        return len(self.overlay) <= OVERLAY_LIMIT
+
+class IndexWorker(QThread):
+    built = pyqtSignal(int, object)   # index generation, SearchIndex
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, data, generation):
+        super().__init__()
+        self.data = data
+        self.generation = generation
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def run(self):
+        try:
+            entries = index_entries(self.data, lambda: self.cancel_requested)
+            if entries is not None:
+                self.built.emit(self.generation, SearchIndex(entries))
+        except Exception as e:
+            # Typically the document was edited while it was being walked; the editor rebuilds
+            self.failed.emit(self.generation, str(e))
@@ -0,0 +1,308 @@
+from collections.abc import MutableSequence
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+import json_journal
+from json_journal import LazyValue
+
+"""
+Lazy tree model over a parsed JSON document, used by editJSON.py.
+
+Rows are backed directly by the dicts and lists of the document. A node's child rows are only
+created when the view asks for them (canFetchMore/fetchMore), in batches of FETCH_BATCH_SIZE, so
+opening or refreshing a large file costs O(top-level entries shown) instead of O(total nodes).
+Edits go through apply_patch(), which changes the document (see json_journal.py) and keeps the
+rows that already exist in step with it. Values that are still LazyValue placeholders (see
+json_loader.py) are parsed when their rows are first fetched.
+"""
+
+FETCH_BATCH_SIZE = 500
+
+def is_container(value):
+    # MutableSequence covers lists and list-like roots such as jsonl_document.JsonlRecords
+    return isinstance(value, (dict, MutableSequence))
+
+def has_children(value):
+    if isinstance(value, LazyValue):
+        return value.has_children
+    return is_container(value) and len(value) > 0
+
+class JsonNode:
+    """One row of the tree. `container` is the dict/list it stands for, once its children are fetched."""
+    __slots__ = ("parent", "key", "row", "children", "keys", "container")
+
+    def __init__(self, parent, key, row):
+        self.parent = parent
+        self.key = key          # dict key or list index inside the parent container
+        self.row = row
+        self.children = []      # child rows created so far
+        self.keys = None        # dict containers: key order snapshot taken on first fetch
+        self.container = None
+
+class JsonTreeModel(QAbstractItemModel):
+    def __init__(self, json_data=None, parent=None):
+        super().__init__(parent)
+        self.json_data = json_data
+        self.root = JsonNode(None, None, 0)
+        self.coerce = None  # Optional str -> value conversion applied to leaves as their rows are fetched
+
+    def set_json_data(self, json_data):
+        """Show a new document. Only the nodes the view expands will ever be created."""
+        self.beginResetModel()
+        self.json_data = json_data
+        self.root = JsonNode(None, None, 0)
+        self.endResetModel()
+
+    # --- Node helpers ---
+
+    def node_from_index(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self.root
+
+    def index_from_node(self, node):
+        if node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def node_value(self, node):
+        if node is self.root:
+            return self.json_data
+        parent_value = node.parent.container
+        return parent_value[node.key]
+
+    def value(self, index):
+        return self.node_value(self.node_from_index(index))
+
+    def node_path(self, node):
+        path = []
+        while node is not self.root:
+            path.append(node.key)
+            node = node.parent
+        path.reverse()
+        return path
+
+    def path(self, index):
+        """Keys/indexes from the document root to `index`."""
+        return self.node_path(self.node_from_index(index))
+
+    def _child_row(self, node, key):
+        """Row a child key has (or will have once fetched) under `node`."""
+        container = self.node_container(node)
+        if not isinstance(container, dict):
+            return int(key)
+        if node.keys is not None:
+            return node.keys.index(key)
+        return list(container).index(key)
+
+    def _find_node(self, path, fetch=False):
+        """Return the node at `path`, or None if it has not been created (and `fetch` is False)."""
+        node = self.root
+        for key in path:
+            row = self._child_row(node, key)
+            if fetch:
+                parent_index = self.index_from_node(node)
+                while row >= len(node.children) and self.canFetchMore(parent_index):
+                    self.fetchMore(parent_index)
+            if row >= len(node.children):
+                return None
+            node = node.children[row]
+        return node
+
+    def index_for_path(self, path):
+        """Model index for `path`, fetching rows along the way so it can be selected."""
+        node = self._find_node(path, fetch=True)
+        if node is None:
+            return QModelIndex()
+        return self.index_from_node(node)
+
+    # --- QAbstractItemModel interface ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if column != 0 or row < 0 or row >= len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_from_node(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node_from_index(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        return has_children(self.value(parent))
+
+    def canFetchMore(self, parent):
+        value = self.value(parent)
+        if isinstance(value, LazyValue):
+            return value.has_children
+        return is_container(value) and len(self.node_from_index(parent).children) < len(value)
+
+    def node_container(self, node):
+        """The value of `node`, parsing it first if it is still a LazyValue."""
+        if node is self.root or not isinstance(self.node_value(node), LazyValue):
+            return self.node_value(node)
+        return json_journal.materialize(node.parent.container, node.key)
+
+    def fetchMore(self, parent):
+        node = self.node_from_index(parent)
+        container = self.node_container(node)
+        if not is_container(container):
+            return
+        if node.container is None and node.parent is self.root and hasattr(self.json_data, "pin"):
+            # A JSONL record's rows hold on to its parsed object, which must stay the one edits change
+            self.json_data.pin(node.key)
+        node.container = container
+        if isinstance(container, dict) and node.keys is None:
+            node.keys = list(container.keys())
+        start = len(node.children)
+        end = min(start + FETCH_BATCH_SIZE, len(container))
+        if end <= start:
+            return
+        self.beginInsertRows(parent, start, end - 1)
+        for row in range(start, end):
+            key = node.keys[row] if node.keys is not None else row
+            if self.coerce is not None and isinstance(container, (dict, list)) and isinstance(container[key], str):
+                container[key] = self.coerce(container[key])
+            node.children.append(JsonNode(node, key, row))
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return str(index.internalPointer().key)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section == 0:
+            return "JSON Structure"
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def extend_root(self, entries):
+        """Append [(key, value), ...] to the top level while a large file is still being scanned."""
+        node = self.root
+        if isinstance(self.json_data, dict):
+            for key, value in entries:
+                if key not in self.json_data:
+                    self.json_data[key] = value
+                    if node.keys is not None:
+                        node.keys.append(key)
+                    continue
+                # Duplicate key: like json.loads, the last value wins and keeps the first one's position
+                self.json_data[key] = value
+                row = node.keys.index(key) if node.keys is not None else len(node.children)
+                if row < len(node.children):
+                    child = node.children[row]
+                    self._reset_children(child)
+                    child_index = self.index_from_node(child)
+                    self.dataChanged.emit(child_index, child_index)
+        else:
+            self.json_data.extend(value for _, value in entries)
+        # Make sure the first screenful of rows shows up without waiting for a scroll
+        if len(node.children) < FETCH_BATCH_SIZE:
+            self.fetchMore(QModelIndex())
+
+    # --- Edits ---
+
+    def _renumber(self, node, start):
+        """Fix rows (and list indexes) of the children of `node` from `start` on."""
+        is_list = node.keys is None
+        for row in range(start, len(node.children)):
+            child = node.children[row]
+            child.row = row
+            if is_list:
+                child.key = row
+
+    def _reset_children(self, node):
+        """Drop the rows under `node` because the value it stands for was replaced."""
+        if node.container is not None and node.parent is self.root and hasattr(self.json_data, "unpin"):
+            self.json_data.unpin(node.key)
+        if node.children:
+            index = self.index_from_node(node)
+            self.beginRemoveRows(index, 0, len(node.children) - 1)
+            node.children = []
+            node.keys = None
+            node.container = None
+            self.endRemoveRows()
+        else:
+            node.keys = None
+            node.container = None
+
+    def apply_patch(self, patch):
+        """Apply a json_journal patch to the document, update existing rows and return the inverse patch."""
+        path = list(patch["path"])
+        parent_node = self._find_node(path[:-1])
+        parent_value = json_journal.resolve_path(self.json_data, path[:-1])
+        op = patch["op"]
+        if op == "set" and isinstance(parent_value, dict) and path[-1] not in parent_value:
+            op = "insert"
+
+        # Rows only need updating when the parent's children have been fetched
+        if parent_node is None or parent_node.container is None:
+            return json_journal.apply_patch(self.json_data, patch)
+
+        parent_index = self.index_from_node(parent_node)
+        key = json_journal.container_key(parent_value, path[-1])
+        fetched = len(parent_node.children)
+
+        if op == "set":
+            inverse = json_journal.apply_patch(self.json_data, patch)
+            row = self._child_row(parent_node, key)
+            if row < fetched:
+                child = parent_node.children[row]
+                self._reset_children(child)
+                child_index = self.index_from_node(child)
+                self.dataChanged.emit(child_index, child_index)
+            return inverse
+
+        if op == "delete":
+            row = self._child_row(parent_node, key)
+            if row >= fetched:
+                inverse = json_journal.apply_patch(self.json_data, patch)
+                if parent_node.keys is not None:
+                    parent_node.keys.pop(row)
+                return inverse
+            self.beginRemoveRows(parent_index, row, row)
+            inverse = json_journal.apply_patch(self.json_data, patch)
+            del parent_node.children[row]
+            if parent_node.keys is not None:
+                parent_node.keys.pop(row)
+            self._renumber(parent_node, row)
+            self.endRemoveRows()
+            return inverse
+
+        if op == "insert":
+            if not isinstance(parent_value, dict):
+                row = key
+            else:
+                row = patch.get("index")
+                if row is None or row > len(parent_node.keys):
+                    row = len(parent_node.keys)
+            # Past the fetched rows (and not simply the next one of a fully fetched parent) it will be fetched later
+            if row > fetched or (row == fetched and fetched < len(parent_value)):
+                inverse = json_journal.apply_patch(self.json_data, patch)
+                if parent_node.keys is not None:
+                    parent_node.keys.insert(row, key)
+                return inverse
+            self.beginInsertRows(parent_index, row, row)
+            inverse = json_journal.apply_patch(self.json_data, dict(patch, op="insert", index=row))
+            if parent_node.keys is not None:
+                parent_node.keys.insert(row, key)
+            parent_node.children.insert(row, JsonNode(parent_node, key, row))
+            self._renumber(parent_node, row)
+            self.endInsertRows()
+            return inverse
+
+        raise ValueError(f"Unknown patch operation: {op}")
@@ -0,0 +1,262 @@
+import os
+import json
+import mmap
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence
+
+"""
+JSON Lines support for editJSON.py.
+
+JsonlRecords presents a .jsonl file as a list of records without reading it into memory: the file
+is memory-mapped, an index of line start/end offsets is built once (two 8-byte integers per line),
+and a record is parsed only when it is displayed or edited, with a small LRU cache of parsed
+records. Saving touches only changed records:
+
+1. A record whose new text fits in its old line is rewritten in place, padded with spaces.
+2. Otherwise its old line is blanked (a whitespace-only tombstone line, skipped when indexing) and
+   the record is appended as a new line at the end of the file.
+3. Deleted records are blanked the same way.
+
+Records that are appended or moved to the end appear there when the file is opened again. Until
+then the editor keeps its own order, so edits are journaled with each record's position in the file
+(journal_patch) and a replay after a crash reaches the record that was edited.
+"""
+
+RECORD_CACHE_SIZE = 256
+INDEX_PROGRESS_BYTES = 16 * 1024 * 1024
+
+class JsonlRecords(MutableSequence):
+    def __init__(self, file_path, cache_size=RECORD_CACHE_SIZE):
+        self.file_path = file_path
+        self.cache_size = cache_size
+        self.starts = array('q')   # byte offset of each record line; -1 for records not yet written
+        self.ends = array('q')     # byte offset of the newline (or end of file) ending each line
+        self.cache = OrderedDict()  # record index -> parsed record, least recently used first
+        self.dirty = set()          # indexes of records to write on the next flush
+        self.pinned = set()         # indexes of records the tree shows children of; never evicted
+        self.blank_ranges = []      # (start, end) of lines to turn into tombstones on the next flush
+        self.file_order = None      # position of each record when the file is reopened; None while it is the index
+        self.file = None
+        self.mm = None
+
+    # --- Index ---
+
+    def open(self, on_progress=None, is_cancelled=None):
+        """Map the file and index its non-blank lines."""
+        self.close()
+        self.file = open(self.file_path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.starts = array('q')
+        self.ends = array('q')
+        self.file_order = None
+        pos = 0
+        next_report = INDEX_PROGRESS_BYTES
+        while pos < size:
+            end = self.mm.find(b"\n", pos)
+            if end == -1:
+                end = size
+            if self.mm[pos:end].strip():
+                self.starts.append(pos)
+                self.ends.append(end)
+            pos = end + 1
+            if pos >= next_report:
+                next_report += INDEX_PROGRESS_BYTES
+                if is_cancelled is not None and is_cancelled():
+                    return False
+                if on_progress is not None:
+                    on_progress(int(100 * pos / size))
+        return True
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _remap(self):
+        """Map the file again after it grew, keeping the index."""
+        self.close()
+        self.file = open(self.file_path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def raw_line(self, i):
+        return self.mm[self.starts[i]:self.ends[i]]
+
+    # --- Sequence interface ---
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _normalize(self, i):
+        if not isinstance(i, int):
+            raise TypeError("JSONL records are indexed by integer position")
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        return i
+
+    def __getitem__(self, i):
+        i = self._normalize(i)
+        if i in self.cache:
+            self.cache.move_to_end(i)
+            return self.cache[i]
+        record = json.loads(self.raw_line(i))
+        self._cache(i, record)
+        return record
+
+    def _cache(self, i, record):
+        self.cache[i] = record
+        self.cache.move_to_end(i)
+        # Evict clean, unpinned records only; dirty ones must survive until they are written
+        for key in list(self.cache):
+            if len(self.cache) <= self.cache_size:
+                break
+            if key not in self.dirty and key not in self.pinned:
+                del self.cache[key]
+
+    def pin(self, i):
+        """Keep record `i` cached, so whoever holds the parsed object keeps seeing the one that is edited."""
+        i = self._normalize(i)
+        self.pinned.add(i)
+
+    def unpin(self, i):
+        self.pinned.discard(i)
+
+    def peek(self, i):
+        """Record `i` without touching the cache, for readers on other threads (e.g. the search index)."""
+        record = self.cache.get(i)
+        if record is not None:
+            return record
+        return json.loads(self.raw_line(i))
+
+    def __setitem__(self, i, record):
+        i = self._normalize(i)
+        self.dirty.add(i)
+        self._cache(i, record)
+
+    def __delitem__(self, i):
+        i = self._normalize(i)
+        if self.starts[i] >= 0:
+            self.blank_ranges.append((self.starts[i], self.ends[i]))
+        del self.starts[i]
+        del self.ends[i]
+        self._shift(i, -1)
+
+    def insert(self, i, record):
+        i = max(0, min(i if i >= 0 else i + len(self), len(self)))
+        self.starts.insert(i, -1)
+        self.ends.insert(i, -1)
+        self._shift(i, 1)
+        self.dirty.add(i)
+        self._cache(i, record)
+
+    def _shift(self, i, step):
+        """Renumber cached, dirty and pinned records at or after `i` after an insert/delete."""
+        def moved(k):
+            return k + step if k >= i else k
+        self.cache = OrderedDict((moved(k), v) for k, v in self.cache.items() if not (step < 0 and k == i))
+        self.dirty = {moved(k) for k in self.dirty if not (step < 0 and k == i)}
+        self.pinned = {moved(k) for k in self.pinned if not (step < 0 and k == i)}
+
+    def patched(self, path):
+        """Called by json_journal.apply_patch: an edit below a record makes that record dirty."""
+        if len(path) > 1:
+            self.dirty.add(int(path[0]))
+
+    def journal_patch(self, patch):
+        """
+        `patch`, just applied, with its record index replaced by the position the journal replays it
+        at: the record's line in the file as of the last flush, which differs from the index once
+        records have been moved to the end. Root inserts and deletes keep that mapping up to date.
+        """
+        if self.file_order is None or not patch["path"]:
+            return patch
+        path = list(patch["path"])
+        i = int(path[0])
+        order = self.file_order
+        if len(path) == 1 and patch["op"] == "insert":
+            # Replayed in front of the record it was inserted before
+            position = order[i] if i < len(order) else len(order)
+            for k in range(len(order)):
+                if order[k] >= position:
+                    order[k] += 1
+            order.insert(i, position)
+        elif len(path) == 1 and patch["op"] == "delete":
+            position = order.pop(i)
+            for k in range(len(order)):
+                if order[k] > position:
+                    order[k] -= 1
+        else:
+            position = order[i]
+        return dict(patch, path=[position] + path[1:])
+
+    def iter_text(self):
+        """Record lines as text, for previews; unsaved records are serialized."""
+        for i in range(len(self)):
+            if i in self.dirty or self.starts[i] < 0:
+                yield json.dumps(self.cache[i]) + "\n"
+            else:
+                yield self.raw_line(i).decode("utf-8") + "\n"
+
+    # --- Saving ---
+
+    def flush(self):
+        """Write dirty records and tombstones in place; records that no longer fit are appended."""
+        if not self.dirty and not self.blank_ranges:
+            return
+        with open(self.file_path, 'r+b') as file:
+            for start, end in self.blank_ranges:
+                file.seek(start)
+                file.write(b" " * (end - start))
+
+            file.seek(0, os.SEEK_END)
+            file_end = file.tell()
+            if file_end and self._last_byte(file) != b"\n":
+                file.write(b"\n")
+                file_end += 1
+
+            for i in sorted(self.dirty):
+                data = json.dumps(self.cache[i]).encode("utf-8")
+                start, end = self.starts[i], self.ends[i]
+                if start >= 0 and len(data) <= end - start:
+                    file.seek(start)
+                    file.write(data + b" " * (end - start - len(data)))
+                    continue
+                if start >= 0:
+                    file.seek(start)
+                    file.write(b" " * (end - start))
+                file.seek(file_end)
+                file.write(data + b"\n")
+                self.starts[i] = file_end
+                self.ends[i] = file_end + len(data)
+                file_end += len(data) + 1
+
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.dirty = set()
+        self.blank_ranges = []
+        self._update_file_order()
+        self._remap()
+
+    def _update_file_order(self):
+        """After a flush, record where each record's line now sits among the lines of the file."""
+        starts = self.starts
+        if all(starts[k] < starts[k + 1] for k in range(len(starts) - 1)):
+            self.file_order = None
+            return
+        self.file_order = array('q', bytes(8 * len(starts)))
+        for position, i in enumerate(sorted(range(len(starts)), key=starts.__getitem__)):
+            self.file_order[i] = position
+
+    def _last_byte(self, file):
+        file.seek(-1, os.SEEK_END)
+        byte = file.read(1)
+        file.seek(0, os.SEEK_END)
+        return byte
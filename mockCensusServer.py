@@ -0,0 +1,183 @@
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+"""
+Local stand-in for the Census API, for testing and benchmarking the getBoCTracts*.py fetchers
+without an API key or network access.
+
+It serves /data/2020/dec/pl (state, county and tract queries, including comma-separated tract
+lists and '*' wildcards) and /data/2020/dec/pl/variables.json from synthetic data: every state has
+the same number of counties and every county the same number of tracts, and each value is a
+deterministic function of its GEOID and variable. Latency, a request rate limit (answered with
+429 and Retry-After) and random 500 errors can be configured. Responses carry an ETag and honour
+If-None-Match.
+
+Point a script at it with CENSUS_API_HOST=http://127.0.0.1:<port>.
+"""
+
+DATASET_PATH = '/data/2020/dec/pl'
+
+class MockCensusOptions:
+    def __init__(self, states=3, counties=5, tracts=20, variables=100, latency=0.05,
+                 rate_limit=None, error_rate=0.0, seed=0):
+        self.states = states          # Number of states (FIPS 01, 02, ...)
+        self.counties = counties      # Counties per state (FIPS 001, 003, ...)
+        self.tracts = tracts          # Tracts per county
+        self.variables = variables    # Number of P1_xxxN/P2_xxxN variables besides NAME
+        self.latency = latency        # Seconds added to every response
+        self.rate_limit = rate_limit  # Requests per second before 429s, None for no limit
+        self.error_rate = error_rate  # Fraction of requests answered with a 500
+        self.random = random.Random(seed)
+
+    def state_codes(self):
+        return [f'{i:02d}' for i in range(1, self.states + 1)]
+
+    def county_codes(self):
+        return [f'{2 * i + 1:03d}' for i in range(self.counties)]
+
+    def tract_codes(self):
+        return [f'{100 * (i + 1):06d}' for i in range(self.tracts)]
+
+    def variable_names(self):
+        half = (self.variables + 1) // 2
+        return ['NAME'] + [f'P{table}_{i:03d}N' for table in (1, 2) for i in range(1, half + 1)][:self.variables]
+
+class MockCensusHandler(BaseHTTPRequestHandler):
+    options = None
+    lock = threading.Lock()
+    request_times = []  # Start times of recent requests, for the rate limit
+    request_count = 0   # Requests served, per server
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        options = self.options
+        with self.lock:
+            type(self).request_count += 1
+            now = time.monotonic()
+            self.request_times[:] = [t for t in self.request_times if now - t < 1.0]
+            throttled = options.rate_limit is not None and len(self.request_times) >= options.rate_limit
+            if not throttled:
+                self.request_times.append(now)
+            failed = options.random.random() < options.error_rate
+        time.sleep(options.latency)
+
+        if throttled:
+            return self.send_text(429, "Too many requests", {"Retry-After": "1"})
+        if failed:
+            return self.send_text(500, "Injected server error")
+
+        url = urlparse(self.path)
+        if url.path == f'{DATASET_PATH}/variables.json':
+            return self.send_json(self.variables_document())
+        if url.path != DATASET_PATH:
+            return self.send_text(404, "Unknown dataset")
+        try:
+            return self.send_json(self.query(parse_qs(url.query)))
+        except ValueError as e:
+            return self.send_text(400, f"error: {e}")
+
+    def variables_document(self):
+        variables = {"for": {"label": "Census API FIPS 'for' clause"}, "in": {"label": "Census API FIPS 'in' clause"}}
+        for name in self.options.variable_names():
+            predicate = "string" if name == "NAME" else "int"
+            variables[name] = {"label": name, "predicateType": predicate}
+        return {"variables": variables}
+
+    def query(self, params):
+        """Rows for a get/for/in query, header first, like the real API."""
+        variables = params.get('get', [''])[0].split(',')
+        known = set(self.options.variable_names())
+        for variable in variables:
+            if variable not in known:
+                raise ValueError(f"unknown variable '{variable}'")
+        level, _, spec = params.get('for', [''])[0].partition(':')
+        within = dict(part.split(':', 1) for part in params.get('in', [''])[0].split() if ':' in part)
+
+        def pick(codes, spec):
+            return codes if spec == '*' else [code for code in codes if code in spec.split(',')]
+
+        if level == 'state':
+            geographies = [(state,) for state in pick(self.options.state_codes(), spec)]
+            columns = ['state']
+        elif level == 'county':
+            states = pick(self.options.state_codes(), within.get('state', '*'))
+            geographies = [(s, c) for s in states for c in pick(self.options.county_codes(), spec)]
+            columns = ['state', 'county']
+        elif level == 'tract':
+            if 'state' not in within:
+                raise ValueError("tract queries need 'in=state:...'")
+            states = pick(self.options.state_codes(), within['state'])
+            counties = pick(self.options.county_codes(), within.get('county', '*'))
+            geographies = [(s, c, t) for s in states for c in counties for t in pick(self.options.tract_codes(), spec)]
+            columns = ['state', 'county', 'tract']
+        else:
+            raise ValueError(f"unknown geography '{level}'")
+
+        rows = [variables + columns]
+        for geography in geographies:
+            geoid = ''.join(geography)
+            values = [f"Area {geoid}" if variable == 'NAME' else str(zlib.crc32(f"{geoid}{variable}".encode()) % 10000)
+                      for variable in variables]
+            rows.append(values + list(geography))
+        return rows
+
+    def send_json(self, document):
+        body = json.dumps(document).encode()
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_text(self, status, text, headers=None):
+        body = text.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_mock_server(options=None, host='127.0.0.1', port=0):
+    """Start the server on a background thread. Returns (server, host URL to use as CENSUS_API_HOST)."""
+    handler = type('Handler', (MockCensusHandler,), {'options': options or MockCensusOptions(), 'request_times': [], 'request_count': 0})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local mock of the Census API (2020/dec/pl)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--states', type=int, default=3)
+    parser.add_argument('--counties', type=int, default=5, help="counties per state")
+    parser.add_argument('--tracts', type=int, default=20, help="tracts per county")
+    parser.add_argument('--variables', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per response")
+    parser.add_argument('--rate-limit', type=float, default=None, help="requests per second before 429s")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of 500 responses")
+    args = parser.parse_args()
+    options = MockCensusOptions(args.states, args.counties, args.tracts, args.variables,
+                                args.latency, args.rate_limit, args.error_rate)
+    server, url = start_mock_server(options, port=args.port)
+    print(f"Mock Census API at {url}{DATASET_PATH} (set CENSUS_API_HOST={url}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()